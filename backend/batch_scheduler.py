@@ -0,0 +1,309 @@
+import asyncio
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from scalability_config import config
+from inference_executor import InferenceExecutor, inference_executor
+from instrumentation import stage_metrics
+from model_registry import model_registry
+from segmentation import Segmentation, Segmenter
+from languages import uses_spaces
+from translation_cache import (
+    SharedTranslationCache,
+    TranslationCache,
+    shared_translation_cache,
+    translation_cache
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap pre-tokenization estimate (NLLB SentencePiece averages ~4 chars per token)"""
+    return len(text) // 4 + 1
+
+
+class PendingTranslation:
+    """A caller waiting for one text to be translated in the next batch"""
+
+    def __init__(self, text: str, future: asyncio.Future, tokens: int):
+        self.text = text
+        self.future = future
+        self.tokens = tokens
+        self.enqueued_at = time.perf_counter()
+
+
+class BatchScheduler:
+    """
+    Coalesces concurrent translation requests into padded batches.
+
+    Requests are held for at most max_wait_ms (or until max_batch_size requests /
+    max_batch_tokens estimated tokens are pending), then grouped by language pair
+    so each group runs a single model.generate call with one forced_bos_token_id.
+    Cached translations are answered immediately and never reach the model.
+    Long messages are split into sentences that join the same batch and are cached
+    individually, so a sentence repeated across messages is only translated once.
+    """
+
+    def __init__(
+        self,
+        service_provider: Callable[[], Awaitable],
+        executor: InferenceExecutor,
+        max_wait_ms: float = 5,
+        max_batch_size: int = 16,
+        max_batch_tokens: int = 2048,
+        cache: Optional[TranslationCache] = None,
+        shared_cache: Optional[SharedTranslationCache] = None,
+        segmenter: Optional[Segmenter] = None
+    ):
+        self.service_provider = service_provider
+        self.executor = executor
+        self.cache = cache
+        self.shared_cache = shared_cache
+        self.segmenter = segmenter
+        self.max_wait_ms = max_wait_ms
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+
+        self._pending: Dict[Tuple[str, str], List[PendingTranslation]] = {}
+        self._pending_count = 0
+        self._pending_tokens = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+        self.batches_run = 0
+        self.requests_batched = 0
+        self.messages_segmented = 0
+        self.segments_translated = 0
+
+    async def prefetch(self, text: str, source_lang: str, target_langs: Iterable[str]):
+        """
+        Pull translations of text for every target language missing from the local
+        cache out of the shared cache in one round trip, so translate() hits locally.
+        """
+        if self.cache is None or self.shared_cache is None or not self.shared_cache.is_available():
+            return
+        missing = [
+            target_lang for target_lang in target_langs
+            if target_lang != source_lang and self.cache.make_key(text, source_lang, target_lang) not in self.cache
+        ]
+        found = await self.shared_cache.get_many(text, source_lang, missing)
+        for target_lang, translation in found.items():
+            self.cache.set(text, source_lang, target_lang, translation)
+
+    def lookup(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        """Return a locally cached translation, or None"""
+        if self.cache is None:
+            return None
+        return self.cache.get(text, source_lang, target_lang)
+
+    def remember(self, source_lang: str, target_lang: str, translations: Dict[str, str]):
+        """Store finished translations in the local cache and write them back to the shared one"""
+        # Failed translations are retried next time rather than cached
+        cacheable = {
+            text: translation for text, translation in translations.items()
+            if not translation.startswith("[Translation Error]")
+        }
+        if self.cache is not None:
+            for text, translation in cacheable.items():
+                self.cache.set(text, source_lang, target_lang, translation)
+        if self.shared_cache is not None:
+            self.shared_cache.store_many(source_lang, target_lang, cacheable)
+
+    def split(self, text: str) -> Optional[Segmentation]:
+        """The sentences text will be translated as, or None when it is translated whole"""
+        if self.segmenter is None:
+            return None
+        return self.segmenter.split(text)
+
+    def _reassemble(self, text: str, segmentation: Segmentation, translations: Dict[str, str], target_lang: str) -> str:
+        # One failed sentence fails the message, so it is retried rather than cached half-translated
+        if any(translations[sentence].startswith("[Translation Error]") for sentence in segmentation.sentences):
+            return f"[Translation Error] {text}"
+        return segmentation.reassemble(translations, spaced=uses_spaces(target_lang))
+
+    async def translate(self, text: str, source_lang: str, target_lang: str) -> str:
+        """Queue text for the next batch and wait for its translation"""
+        segmentation = self.split(text)
+        if segmentation is None:
+            cached = self.lookup(text, source_lang, target_lang)
+            if cached is not None:
+                return cached
+            return await self._enqueue(text, source_lang, target_lang)
+
+        # Segmented messages are never cached whole: cache keys normalize whitespace, so another
+        # message with the same sentences would get this one's layout. Their sentences are cached instead.
+
+        # Every uncached sentence is queued in this tick, so they share one padded batch
+        sentences = segmentation.sentences
+        self.messages_segmented += 1
+        self.segments_translated += len(sentences)
+        translated = await asyncio.gather(*(self._translate_sentence(sentence, source_lang, target_lang) for sentence in sentences))
+        return self._reassemble(text, segmentation, dict(zip(sentences, translated)), target_lang)
+
+    async def _translate_sentence(self, sentence: str, source_lang: str, target_lang: str) -> str:
+        cached = self.lookup(sentence, source_lang, target_lang)
+        if cached is not None:
+            return cached
+        return await self._enqueue(sentence, source_lang, target_lang)
+
+    async def _enqueue(self, text: str, source_lang: str, target_lang: str) -> str:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        tokens = estimate_tokens(text)
+
+        self._pending.setdefault((source_lang, target_lang), []).append(
+            PendingTranslation(text, future, tokens)
+        )
+        self._pending_count += 1
+        self._pending_tokens += tokens
+
+        if self._pending_count >= self.max_batch_size or self._pending_tokens >= self.max_batch_tokens:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait_ms / 1000, self._flush)
+
+        return await future
+
+    async def translate_many(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        """
+        Translate a known set of texts (e.g. a history page) without waiting for the batching
+        window. Uncached texts are sorted by length and run in as few batches as the size and
+        token limits allow, one at a time, so a large backlog can't crowd out live messages.
+        """
+        results: Dict[str, str] = {}
+        async for translations in self.iter_translations(texts, source_lang, target_lang):
+            results.update(translations)
+        return [results[text] for text in texts]
+
+    async def iter_translations(self, texts: Iterable[str], source_lang: str, target_lang: str) -> AsyncIterator[Dict[str, str]]:
+        """
+        Like translate_many, but yields {text: translation} as each batch finishes
+        (cached texts first). Duplicate texts are translated and yielded once; segmented
+        texts are yielded together after the last batch, once all their sentences are done.
+        """
+        # Units are uncached whole texts or the sentences of segmented ones: {unit: translation or None}.
+        # As in translate, segmented texts are only looked up and cached sentence by sentence.
+        cached_results: Dict[str, str] = {}
+        segmentations: Dict[str, Segmentation] = {}
+        units: Dict[str, Optional[str]] = {}
+        wanted = set()
+        for text in dict.fromkeys(texts):
+            segmentation = self.split(text)
+            if segmentation is None:
+                cached = self.lookup(text, source_lang, target_lang)
+                if cached is not None:
+                    cached_results[text] = cached
+                else:
+                    units[text] = None
+                    wanted.add(text)
+                continue
+            segmentations[text] = segmentation
+            self.messages_segmented += 1
+            self.segments_translated += len(segmentation.sentences)
+            for sentence in segmentation.sentences:
+                if units.get(sentence) is None:
+                    units[sentence] = self.lookup(sentence, source_lang, target_lang)
+        if cached_results:
+            yield cached_results
+
+        untranslated = [unit for unit, translation in units.items() if translation is None]
+
+        if untranslated:
+            ts = await self.service_provider()
+            # Similar lengths in one batch keep padding to a minimum
+            untranslated.sort(key=estimate_tokens)
+            for chunk in self._chunk(untranslated):
+                translations = await self.executor.run(ts.translate_batch, chunk, source_lang, target_lang)
+                self.batches_run += 1
+                self.requests_batched += len(chunk)
+                fresh = dict(zip(chunk, translations))
+                self.remember(source_lang, target_lang, fresh)
+                units.update(fresh)
+                whole = {
+                    text: translation for text, translation in fresh.items()
+                    if text in wanted and text not in segmentations
+                }
+                if whole:
+                    yield whole
+
+        if segmentations:
+            yield {
+                text: self._reassemble(text, segmentation, units, target_lang)
+                for text, segmentation in segmentations.items()
+            }
+
+    def _chunk(self, texts: List[str]) -> List[List[str]]:
+        chunks: List[List[str]] = [[]]
+        chunk_tokens = 0
+        for text in texts:
+            tokens = estimate_tokens(text)
+            if chunks[-1] and (len(chunks[-1]) >= self.max_batch_size or chunk_tokens + tokens > self.max_batch_tokens):
+                chunks.append([])
+                chunk_tokens = 0
+            chunks[-1].append(text)
+            chunk_tokens += tokens
+        return chunks
+
+    def _flush(self):
+        """Hand every pending group to the inference executor"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        pending = self._pending
+        self._pending = {}
+        self._pending_count = 0
+        self._pending_tokens = 0
+
+        for (source_lang, target_lang), items in pending.items():
+            asyncio.ensure_future(self._run_group(source_lang, target_lang, items))
+
+    async def _run_group(self, source_lang: str, target_lang: str, items: List[PendingTranslation]):
+        # Identical texts in the same group are only translated once
+        unique_texts = list(dict.fromkeys(item.text for item in items))
+
+        def run_batch(ts):
+            # Queue time covers the batching window plus waiting for a free inference worker
+            started = time.perf_counter()
+            for item in items:
+                stage_metrics.observe("queue", (started - item.enqueued_at) * 1000, source_lang, target_lang)
+            return ts.translate_batch(unique_texts, source_lang, target_lang)
+
+        try:
+            ts = await self.service_provider()
+            translations = await self.executor.run(run_batch, ts)
+        except Exception as e:
+            for item in items:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        self.batches_run += 1
+        self.requests_batched += len(items)
+        results = dict(zip(unique_texts, translations))
+        self.remember(source_lang, target_lang, results)
+        for item in items:
+            if not item.future.done():
+                item.future.set_result(results[item.text])
+
+    def get_stats(self) -> Dict[str, float]:
+        return {
+            "max_wait_ms": self.max_wait_ms,
+            "max_batch_size": self.max_batch_size,
+            "max_batch_tokens": self.max_batch_tokens,
+            "pending": self._pending_count,
+            "batches_run": self.batches_run,
+            "requests_batched": self.requests_batched,
+            "avg_batch_size": self.requests_batched / self.batches_run if self.batches_run else 0,
+            "messages_segmented": self.messages_segmented,
+            "segments_translated": self.segments_translated
+        }
+
+
+translation_scheduler = BatchScheduler(
+    service_provider=model_registry.get_async,
+    executor=inference_executor,
+    max_wait_ms=config.batch_max_wait_ms,
+    max_batch_size=config.batch_max_size,
+    max_batch_tokens=config.batch_max_tokens,
+    cache=translation_cache,
+    shared_cache=shared_translation_cache,
+    segmenter=Segmenter(config.segment_min_chars, config.segment_max_chars) if config.segment_min_chars > 0 else None
+)
@@ -0,0 +1,36 @@
+from typing import AsyncIterator, Dict, List, Tuple
+from batch_scheduler import BatchScheduler
+from models import TranslationRequest
+
+
+def group_by_language_pair(items: List[TranslationRequest]) -> Dict[Tuple[str, str], Dict[str, List[int]]]:
+    """{(source, target): {text: [indexes of items asking for it]}}, so each distinct text runs once per pair"""
+    groups: Dict[Tuple[str, str], Dict[str, List[int]]] = {}
+    for index, item in enumerate(items):
+        groups.setdefault((item.source_lang, item.target_lang), {}).setdefault(item.text, []).append(index)
+    return groups
+
+
+async def iter_batch_results(items: List[TranslationRequest], scheduler: BatchScheduler) -> AsyncIterator[Tuple[int, str]]:
+    """
+    Yield (item index, translation) for every item as its batch completes.
+    Language pairs run one after another through the scheduler's bounded batches.
+    """
+    for (source_lang, target_lang), indexes_by_text in group_by_language_pair(items).items():
+        if source_lang == target_lang:
+            for text, indexes in indexes_by_text.items():
+                for index in indexes:
+                    yield index, text
+            continue
+        async for batch in scheduler.iter_translations(indexes_by_text, source_lang, target_lang):
+            for text, translation in batch.items():
+                for index in indexes_by_text[text]:
+                    yield index, translation
+
+
+async def translate_batch_in_order(items: List[TranslationRequest], scheduler: BatchScheduler) -> List[str]:
+    """Translations for every item, in request order"""
+    results: List[str] = [""] * len(items)
+    async for index, translation in iter_batch_results(items, scheduler):
+        results[index] = translation
+    return results
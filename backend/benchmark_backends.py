@@ -0,0 +1,94 @@
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from inference_backends import BACKENDS
+
+# Held-out sentences with reference translations, for BLEU
+EVAL_SET = [
+    ("How are you today?", "eng_Latn", "spa_Latn", "¿Cómo estás hoy?"),
+    ("The meeting starts at ten tomorrow.", "eng_Latn", "spa_Latn", "La reunión empieza mañana a las diez."),
+    ("I will send you the report tonight.", "eng_Latn", "fra_Latn", "Je t'enverrai le rapport ce soir."),
+    ("Where did you park the car?", "eng_Latn", "fra_Latn", "Où as-tu garé la voiture ?"),
+    ("The weather is nice this weekend.", "eng_Latn", "deu_Latn", "Das Wetter ist an diesem Wochenende schön."),
+    ("Can you call me after lunch?", "eng_Latn", "deu_Latn", "Kannst du mich nach dem Mittagessen anrufen?"),
+]
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        return peak_rss_mb()
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def benchmark_backend(backend: str, repeats: int = 3, batch_size: int = 16):
+    """Measure one backend in this process (run each backend in its own process for a clean RSS)"""
+    from translation_service import TranslationService
+    from evaluation import ModelEvaluator
+
+    rss_before = current_rss_mb()
+    start_time = time.perf_counter()
+    ts = TranslationService(backend=backend)
+    load_seconds = time.perf_counter() - start_time
+    rss_loaded = current_rss_mb()
+
+    # Warm up so one-off allocations don't skew the first sample
+    ts.translate(EVAL_SET[0][0], EVAL_SET[0][1], EVAL_SET[0][2])
+
+    latencies, hypotheses = [], []
+    for text, src, tgt, _ in EVAL_SET:
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            translation = ts.translate(text, src, tgt)
+            latencies.append((time.perf_counter() - start_time) * 1000)
+        hypotheses.append(translation)
+
+    # Throughput: one padded batch per language pair, as the batch scheduler would run it
+    batch_texts = [text for text, _, _, _ in EVAL_SET]
+    batch_texts = (batch_texts * (batch_size // len(batch_texts) + 1))[:batch_size]
+    start_time = time.perf_counter()
+    ts.translate_batch(batch_texts, "eng_Latn", "spa_Latn")
+    batch_seconds = time.perf_counter() - start_time
+
+    references = [[reference for _, _, _, reference in EVAL_SET]]
+    return {
+        "backend": backend,
+        "device": ts.device,
+        "load_seconds": round(load_seconds, 2),
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies), 2),
+            "p50": round(statistics.median(latencies), 2),
+            "p95": round(statistics.quantiles(latencies, n=20)[18], 2)
+        },
+        "throughput_sentences_per_s": round(batch_size / batch_seconds, 2),
+        "rss_mb": {
+            "model": round(rss_loaded - rss_before, 1),
+            "total": round(current_rss_mb(), 1),
+            "peak": round(peak_rss_mb(), 1)
+        },
+        "bleu": round(ModelEvaluator().calculate_bleu(references, hypotheses), 2)
+    }
+
+def compare(backends):
+    results = []
+    for backend in backends:
+        # A fresh interpreter per backend keeps RSS and torch thread settings independent
+        output = subprocess.run(
+            [sys.executable, __file__, "--single", backend],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--single":
+        print(json.dumps(benchmark_backend(sys.argv[2])))
+    else:
+        print(json.dumps(compare(sys.argv[1:] or list(BACKENDS)), indent=2))
@@ -0,0 +1,64 @@
+from transformers import pipeline
+import json
+import statistics
+import time
+from translation_service import TranslationService
+
+# Short chat messages that miss the greeting shortcuts and go through the model
+CASES = [
+    ("How are you?", "eng_Latn", "spa_Latn"),
+    ("See you tomorrow", "eng_Latn", "fra_Latn"),
+    ("Where are you now?", "eng_Latn", "deu_Latn"),
+    ("That sounds great", "eng_Latn", "ita_Latn"),
+]
+
+def time_ms(func, repeats: int):
+    samples = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start_time) * 1000)
+    return samples
+
+def summarize(samples):
+    return {
+        "mean_ms": round(statistics.mean(samples), 2),
+        "median_ms": round(statistics.median(samples), 2),
+        "min_ms": round(min(samples), 2)
+    }
+
+def benchmark(repeats: int = 10):
+    ts = TranslationService()
+
+    # Warm up the model so one-off allocations don't skew the first case
+    ts.translate(CASES[0][0], CASES[0][1], CASES[0][2])
+
+    before, after = [], []
+    for text, src, tgt in CASES:
+        def pipeline_per_call():
+            # Previous implementation: a new pipeline object for every message
+            translator = pipeline(
+                "translation",
+                model=ts.model,
+                tokenizer=ts.tokenizer,
+                src_lang=src,
+                tgt_lang=tgt,
+                device=0 if ts.device == "cuda" else -1,
+                max_length=512
+            )
+            translator(text)
+
+        before.extend(time_ms(pipeline_per_call, repeats))
+        after.extend(time_ms(lambda: ts.translate(text, src, tgt), repeats))
+
+    return {
+        "device": ts.device,
+        "messages": len(CASES),
+        "repeats": repeats,
+        "pipeline_per_call": summarize(before),
+        "persistent_engine": summarize(after),
+        "speedup": round(statistics.mean(before) / statistics.mean(after), 2)
+    }
+
+if __name__ == "__main__":
+    print(json.dumps(benchmark(), indent=2))
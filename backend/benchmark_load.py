@@ -0,0 +1,267 @@
+import argparse
+import asyncio
+import json
+import random
+import socket
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import uvicorn
+import websockets
+
+from latency_stats import LatencyHistogram
+
+
+class StubTranslationService:
+    """
+    Deterministic stand-in for TranslationService: fixed latency per batch plus per text,
+    output "[tgt] text". Lets fan-out, serialization and scheduling be measured without the model.
+    """
+
+    def __init__(self, batch_latency_ms: float = 20, item_latency_ms: float = 2, stream_chunks: int = 4):
+        self.model_name = "stub"
+        self.device = "cpu"
+        self.batch_latency_ms = batch_latency_ms
+        self.item_latency_ms = item_latency_ms
+        self.stream_chunks = stream_chunks
+
+    def translate(self, text: str, source_lang: str, target_lang: str) -> str:
+        return self.translate_batch([text], source_lang, target_lang)[0]
+
+    def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        time.sleep((self.batch_latency_ms + self.item_latency_ms * len(texts)) / 1000)
+        return [f"[{target_lang}] {text}" for text in texts]
+
+    def translate_stream(self, text: str, source_lang: str, target_lang: str, on_delta: Callable[[str], None]) -> str:
+        translated_text = f"[{target_lang}] {text}"
+        chunk_size = max(1, len(translated_text) // self.stream_chunks + 1)
+        step_seconds = (self.batch_latency_ms + self.item_latency_ms) / 1000 / self.stream_chunks
+        for i in range(0, len(translated_text), chunk_size):
+            time.sleep(step_seconds)
+            on_delta(translated_text[i:i + chunk_size])
+        return translated_text
+
+
+def parse_language_mix(spec: str) -> List[Tuple[str, float]]:
+    """Parse "eng_Latn:0.5,spa_Latn:0.3,fra_Latn:0.2" into [(lang, weight), ...]"""
+    mix = []
+    for item in spec.split(","):
+        lang, _, weight = item.strip().partition(":")
+        if lang:
+            mix.append((lang, float(weight or 1)))
+    return mix
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class LoadTest:
+    """Drives simulated websocket clients against an in-process server and collects delivery latencies"""
+
+    def __init__(
+        self,
+        clients: int,
+        rooms: int,
+        language_mix: List[Tuple[str, float]],
+        rate: float,
+        duration: float,
+        streaming: bool = False,
+        drain_seconds: float = 10,
+        seed: int = 42
+    ):
+        self.clients = clients
+        self.rooms = rooms
+        self.language_mix = language_mix
+        self.rate = rate
+        self.duration = duration
+        self.streaming = streaming
+        self.drain_seconds = drain_seconds
+        self.random = random.Random(seed)
+
+        # content -> (send time, room); content is unique per message
+        self.sent_at: Dict[str, Tuple[float, str]] = {}
+        self.room_members: Dict[str, int] = {}
+        self.latency = LatencyHistogram()
+        self.first_delta_latency = LatencyHistogram()
+        self.delivered = 0
+        self.errors = 0
+        self.stop_sending_at = 0.0
+
+    def _assign(self) -> List[Tuple[str, str, str]]:
+        """(client_id, room, lang) for every simulated client"""
+        langs = [lang for lang, _ in self.language_mix]
+        weights = [weight for _, weight in self.language_mix]
+        assignments = []
+        for i in range(self.clients):
+            room = f"room{i % self.rooms}"
+            self.room_members[room] = self.room_members.get(room, 0) + 1
+            assignments.append((f"load{i}", room, self.random.choices(langs, weights)[0]))
+        return assignments
+
+    async def _client(self, base_url: str, client_id: str, room: str, lang: str, start: asyncio.Event, done: asyncio.Event):
+        url = f"{base_url}/ws/{room}/{client_id}?lang={lang}&stream={'true' if self.streaming else 'false'}"
+        async with websockets.connect(url, max_queue=None) as ws:
+            receiver = asyncio.create_task(self._receive(ws))
+            await start.wait()
+            # Spread first sends so clients don't fire in lockstep
+            await asyncio.sleep(self.random.random() / self.rate)
+            seq = 0
+            while time.perf_counter() < self.stop_sending_at:
+                content = f"load test message {seq} from {client_id}"
+                self.sent_at[content] = (time.perf_counter(), room)
+                await ws.send(json.dumps({"content": content}))
+                seq += 1
+                await asyncio.sleep(self.random.expovariate(self.rate))
+            # Keep receiving until every delivery arrived (or the drain timeout passed)
+            await done.wait()
+            receiver.cancel()
+
+    async def _receive(self, ws):
+        # Delta frames only carry the message id; the final frame links it to the original text
+        first_delta_at: Dict[str, float] = {}
+        try:
+            async for raw in ws:
+                received = time.perf_counter()
+                frame = json.loads(raw)
+                if frame.get("type") == "translation_delta":
+                    first_delta_at.setdefault(frame["id"], received)
+                    continue
+                sent = self.sent_at.get(frame.get("original"))
+                if sent is not None and "translated" in frame:
+                    self.latency.record((received - sent[0]) * 1000)
+                    if frame.get("id") in first_delta_at:
+                        self.first_delta_latency.record((first_delta_at.pop(frame["id"]) - sent[0]) * 1000)
+                    self.delivered += 1
+        except websockets.ConnectionClosed:
+            self.errors += 1
+
+    def _expected_deliveries(self) -> int:
+        # Every message goes to everyone else in its room
+        return sum(self.room_members[room] - 1 for _, room in self.sent_at.values())
+
+    async def run(self, base_url: str) -> Dict[str, object]:
+        assignments = self._assign()
+        start = asyncio.Event()
+        done = asyncio.Event()
+        tasks = [
+            asyncio.create_task(self._client(base_url, client_id, room, lang, start, done))
+            for client_id, room, lang in assignments
+        ]
+        # Let every client connect (and join notices settle) before measuring
+        await asyncio.sleep(1.0)
+        started = time.perf_counter()
+        self.stop_sending_at = started + self.duration
+        start.set()
+
+        await asyncio.sleep(self.duration)
+        drain_deadline = time.perf_counter() + self.drain_seconds
+        while self._expected_deliveries() > self.delivered and time.perf_counter() < drain_deadline:
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - started
+        done.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        expected = self._expected_deliveries()
+        return {
+            "messages_sent": len(self.sent_at),
+            "deliveries": self.delivered,
+            "deliveries_expected": expected,
+            "delivery_ratio": round(self.delivered / expected, 4) if expected else None,
+            "send_throughput_msgs_per_s": round(len(self.sent_at) / self.duration, 2),
+            "delivery_throughput_per_s": round(self.delivered / elapsed, 2),
+            "end_to_end_ms": {key: round(value, 2) for key, value in self.latency.quantiles((0.5, 0.95, 0.99)).items()},
+            "end_to_end_mean_ms": round(self.latency.mean(), 2),
+            "first_delta_ms": {key: round(value, 2) for key, value in self.first_delta_latency.quantiles((0.5, 0.95, 0.99)).items()},
+            "connection_errors": self.errors
+        }
+
+
+async def run_benchmark(args) -> Dict[str, object]:
+    # Logs go to stderr so stdout carries only the JSON report (e.g. for piping into jq);
+    # this must run before main configures logging on import
+    from logging_config import setup_logging
+    setup_logging(stream=sys.stderr)
+    # Imported here so the CLI can choose the translator before the app starts
+    from main import app
+    from model_registry import model_registry
+    from instrumentation import stage_metrics
+    from batch_scheduler import translation_scheduler
+    from translation_cache import translation_cache
+    from inference_executor import inference_executor
+
+    if not args.real_model:
+        model_registry.factory = lambda: StubTranslationService(args.stub_batch_ms, args.stub_item_ms)
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", ws_max_size=1 << 20))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    await model_registry.get_async()
+    stage_metrics.reset()
+
+    load_test = LoadTest(
+        clients=args.clients,
+        rooms=args.rooms,
+        language_mix=parse_language_mix(args.languages),
+        rate=args.rate,
+        duration=args.duration,
+        streaming=args.stream,
+        drain_seconds=args.drain,
+        seed=args.seed
+    )
+    results = await load_test.run(f"ws://127.0.0.1:{port}")
+
+    server.should_exit = True
+    await server_task
+
+    return {
+        "config": {
+            "clients": args.clients,
+            "rooms": args.rooms,
+            "languages": args.languages,
+            "rate_per_client": args.rate,
+            "duration_s": args.duration,
+            "streaming": args.stream,
+            "translator": "model" if args.real_model else f"stub({args.stub_batch_ms}ms/batch + {args.stub_item_ms}ms/text)",
+            "seed": args.seed
+        },
+        "results": results,
+        "stages": stage_metrics.snapshot(),
+        "batching": translation_scheduler.get_stats(),
+        "translation_cache": translation_cache.get_stats(),
+        "inference_queue": inference_executor.get_stats()
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="In-process websocket load test; prints a JSON report")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--rooms", type=int, default=5)
+    parser.add_argument("--languages", default="eng_Latn:0.5,spa_Latn:0.3,fra_Latn:0.2",
+                        help="lang:weight pairs used to assign each client's language")
+    parser.add_argument("--rate", type=float, default=0.5, help="messages per second per client")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of sending")
+    parser.add_argument("--drain", type=float, default=10, help="seconds to wait for outstanding deliveries")
+    parser.add_argument("--stream", action="store_true", help="clients request translation_delta frames")
+    parser.add_argument("--real-model", action="store_true", help="use the real NLLB model instead of the stub")
+    parser.add_argument("--stub-batch-ms", type=float, default=20)
+    parser.add_argument("--stub-item-ms", type=float, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_benchmark(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import json
+import re
+import statistics
+import time
+from pii_sanitizer import SanitizerEngine
+
+# Typical chat traffic is mostly PII-free; the rest exercises every detector
+CLEAN_MESSAGES = [
+    "Hey, how are you doing today?",
+    "See you at the cafe after work",
+    "That sounds great, let's do it",
+    "I can't make it tonight, sorry!",
+]
+# Numbers that are not PII and must come through unchanged
+NUMERIC_MESSAGES = [
+    "The price is 1 000 000 dollars",
+    "We met in 1999 2000 2001 and 2002",
+    "Population grew to 2.500.000 last year",
+    "Order 12345678 shipped on 2024-03-15",
+    "Scores were 120 340 560 780 this season",
+    "The total is 1234567.89 EUR, pi is 3.14159265",
+    "Release v10.0.19041.1 ships to zip 90210-1234",
+]
+PII_MESSAGES = [
+    "Mail me at jane.doe@example.com",
+    "Call me on +44 20 7946 0958 or 555-123-4567",
+    "Office: (555) 123-4567, home 020 7946 0958, cell 555 123 4567",
+    "My card is 4111 1111 1111 1111",
+    "The server is at 192.168.1.10 and 2001:db8::ff00:42:8329",
+    "Docs are on https://example.com/docs?page=2",
+]
+
+def legacy_sanitize(message: str) -> str:
+    # Previous implementation: re-imported and re-parsed per call, one pass per pattern
+    import re
+    message = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '[EMAIL]', message)
+    message = re.sub(r'\b\d{3}-\d{3}-\d{4}\b', '[PHONE]', message)
+    return message
+
+def naive_multi_pass(detectors):
+    # Same detectors and validators, but one re.sub pass over the message per detector
+    def replacer(detector):
+        return lambda match: detector.placeholder if detector.accepts(match.group(0)) else match.group(0)
+    passes = [(re.compile(detector.pattern), replacer(detector)) for detector in detectors]
+
+    def sanitize(message: str) -> str:
+        for regex, replace in passes:
+            message = regex.sub(replace, message)
+        return message
+    return sanitize
+
+def time_us_per_message(func, messages, repeats: int):
+    samples = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        for message in messages:
+            func(message)
+        samples.append((time.perf_counter() - start_time) * 1e6 / len(messages))
+    return round(statistics.median(samples), 2)
+
+def benchmark(repeats: int = 2000):
+    engine = SanitizerEngine()
+    multi_pass = naive_multi_pass(engine.detectors)
+
+    results = {"repeats": repeats}
+    for name, messages in (("clean", CLEAN_MESSAGES), ("pii", PII_MESSAGES), ("mixed", CLEAN_MESSAGES * 4 + PII_MESSAGES)):
+        results[name] = {
+            "legacy_two_patterns_us": time_us_per_message(legacy_sanitize, messages, repeats),
+            "multi_pass_all_detectors_us": time_us_per_message(multi_pass, messages, repeats),
+            "single_pass_engine_us": time_us_per_message(engine.sanitize, messages, repeats)
+        }
+    results["detections"] = engine.get_stats()["detections"]
+    # Anything listed here was wrongly redacted
+    results["false_positives"] = [message for message in NUMERIC_MESSAGES if engine.sanitize(message) != message]
+    return results
+
+if __name__ == "__main__":
+    print(json.dumps(benchmark(), indent=2))
@@ -0,0 +1,116 @@
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Must only be imported once the model loads (model_registry) or an evaluation runs
+FORBIDDEN_MODULES = ("torch", "transformers", "sacrebleu")
+
+
+def parse_importtime(output: str) -> Dict[str, Tuple[int, int]]:
+    """Parse `python -X importtime` stderr into {module: (self_us, cumulative_us)}"""
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if self_us.strip().isdigit():
+            modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def measure_imports(module: str = "main") -> Dict[str, Tuple[int, int]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    return parse_importtime(result.stderr)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_health(timeout: float = 30) -> float:
+    """Seconds from spawning a uvicorn worker until /health first answers (503 while the model warms up counts)"""
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+            try:
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+                connection.request("GET", "/health")
+                connection.getresponse().read()
+                return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"/health did not answer within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def check(import_budget_ms: float, health_budget_ms: Optional[float], top: int = 10) -> Tuple[Dict[str, object], List[str]]:
+    """Report on main's import cost (and /health time to first answer) plus any budget violations"""
+    modules = measure_imports("main")
+    failures = []
+
+    forbidden = sorted({name for name in modules if name.split(".")[0] in FORBIDDEN_MODULES})
+    if forbidden:
+        failures.append(f"heavy modules imported by main: {', '.join(forbidden)}")
+
+    import_ms = modules["main"][1] / 1000
+    if import_ms > import_budget_ms:
+        failures.append(f"import main took {import_ms:.0f}ms (budget {import_budget_ms:.0f}ms)")
+
+    slowest = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:top]
+    report = {
+        "import_main_ms": round(import_ms, 1),
+        "import_budget_ms": import_budget_ms,
+        "modules_imported": len(modules),
+        "forbidden_imported": forbidden,
+        "slowest_self_ms": {name: round(self_us / 1000, 1) for name, (self_us, _) in slowest}
+    }
+
+    if health_budget_ms is not None:
+        health_ms = measure_health() * 1000
+        report["health_first_answer_ms"] = round(health_ms, 1)
+        report["health_budget_ms"] = health_budget_ms
+        if health_ms > health_budget_ms:
+            failures.append(f"/health first answered after {health_ms:.0f}ms (budget {health_budget_ms:.0f}ms)")
+
+    report["failures"] = failures
+    return report, failures
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Cold-start regression check for the app's import path; exits 1 over budget")
+    parser.add_argument("--import-budget-ms", type=float, default=750, help="cumulative `import main` time")
+    parser.add_argument("--health-budget-ms", type=float, default=1500,
+                        help="process spawn to first /health answer")
+    parser.add_argument("--skip-health", action="store_true", help="only check imports (no server is started)")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest imports to report")
+    args = parser.parse_args(argv)
+
+    report, failures = check(args.import_budget_ms, None if args.skip_health else args.health_budget_ms, args.top)
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+from fastapi import WebSocket
+from typing import Callable, Dict, Optional
+from instrumentation import stage_metrics
+
+logger = logging.getLogger(__name__)
+
+# Close code sent to consumers that can't keep up (RFC 6455 "Try Again Later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class ClientConnection:
+    """
+    One websocket plus a bounded outbound queue drained by its own writer task.
+    Broadcasts only enqueue frames, so a slow recipient never delays the others.
+
+    When the queue is full the slow-consumer policy applies:
+    "drop_oldest" discards the oldest queued frame, "disconnect" closes the socket.
+    A single send that exceeds send_timeout also disconnects the client.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        client_id: str,
+        lang: str,
+        room: str,
+        max_queue_size: int = 256,
+        send_timeout: float = 5.0,
+        slow_consumer_policy: str = "drop_oldest",
+        on_evict: Optional[Callable[["ClientConnection"], None]] = None,
+        streaming: bool = False,
+        anonymized_id: Optional[str] = None
+    ):
+        self.ws = websocket
+        self.client_id = client_id
+        # Sender id shown to other clients, computed once at connect time
+        self.anonymized_id = anonymized_id or client_id
+        self.lang = lang
+        self.room = room
+        # Client asked for translation_delta frames while its translation is generated
+        self.streaming = streaming
+        self.send_timeout = send_timeout
+        self.slow_consumer_policy = slow_consumer_policy
+        self.on_evict = on_evict
+
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=max_queue_size)
+        self._writer_task: Optional[asyncio.Task] = None
+        self.closed = False
+
+        self.sent = 0
+        self.dropped = 0
+        self.max_queue_depth_seen = 0
+
+    def start(self):
+        self._writer_task = asyncio.ensure_future(self._writer())
+
+    def enqueue(self, frame: str) -> bool:
+        """Queue a frame for delivery without waiting; returns False if it was not queued"""
+        if self.closed:
+            return False
+
+        if self.queue.full():
+            if self.slow_consumer_policy == "disconnect":
+                self.dropped += 1
+                self.evict("outbound queue full")
+                return False
+            # drop_oldest: stale chat frames matter less than fresh ones
+            self.queue.get_nowait()
+            self.dropped += 1
+
+        self.queue.put_nowait(frame)
+        self.max_queue_depth_seen = max(self.max_queue_depth_seen, self.queue.qsize())
+        return True
+
+    async def _writer(self):
+        while True:
+            frame = await self.queue.get()
+            try:
+                with stage_metrics.span("send", target_lang=self.lang):
+                    await asyncio.wait_for(self.ws.send_text(frame), timeout=self.send_timeout)
+                self.sent += 1
+            except asyncio.TimeoutError:
+                self.evict(f"send exceeded {self.send_timeout}s")
+                return
+            except Exception as e:
+                logger.warning("Error sending to %s: %s", self.anonymized_id, e)
+                self.evict("send failed")
+                return
+
+    def evict(self, reason: str):
+        """Stop delivering to this client and close its socket"""
+        if self.closed:
+            return
+        logger.warning("Evicting slow consumer %s from %s: %s", self.anonymized_id, self.room, reason)
+        self.close()
+        asyncio.ensure_future(self._close_socket())
+        if self.on_evict is not None:
+            self.on_evict(self)
+
+    async def _close_socket(self):
+        try:
+            await self.ws.close(code=SLOW_CONSUMER_CLOSE_CODE)
+        except Exception:
+            pass
+
+    def close(self):
+        """Stop the writer task; queued frames are discarded"""
+        self.closed = True
+        if self._writer_task is not None and self._writer_task is not asyncio.current_task():
+            self._writer_task.cancel()
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "anonymized_id": self.anonymized_id,
+            "room": self.room,
+            "lang": self.lang,
+            "streaming": self.streaming,
+            "queue_depth": self.queue.qsize(),
+            "max_queue_depth_seen": self.max_queue_depth_seen,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "closed": self.closed
+        }
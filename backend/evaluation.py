@@ -1,23 +1,25 @@
 import time
 import json
 import statistics
-from sacrebleu.metrics import BLEU
 from typing import List, Dict, Tuple
-from translation_service import TranslationService
+from model_registry import model_registry
+from latency_stats import LatencyHistogram, LatencyRing
 
 class ModelEvaluator:
     def __init__(self):
-        self.translation_service = None
-        self.latency_history = []
+        # Fixed-memory latency statistics: all-time quantiles plus the most recent samples
+        self.latency_histogram = LatencyHistogram()
+        self.recent_latencies = LatencyRing(size=10)
         self.bleu_scores = []
     
     def get_translation_service(self):
-        if self.translation_service is None:
-            self.translation_service = TranslationService()
-        return self.translation_service
+        # Shares the chat server's model instead of loading a second copy
+        return model_registry.get()
     
     def calculate_bleu(self, references: List[List[str]], hypotheses: List[str]) -> float:
         """Calculate BLEU score"""
+        # sacrebleu is only needed for offline evaluation, so keep it off the server's import path
+        from sacrebleu.metrics import BLEU
         bleu = BLEU()
         score = bleu.corpus_score(hypotheses, references)
         return score.score
@@ -29,8 +31,12 @@ class ModelEvaluator:
         result = ts.translate(text, source_lang, target_lang)
         end_time = time.time()
         latency_ms = (end_time - start_time) * 1000
-        self.latency_history.append(latency_ms)
+        self.record_latency(latency_ms)
         return result, latency_ms
+
+    def record_latency(self, latency_ms: float):
+        self.latency_histogram.record(latency_ms)
+        self.recent_latencies.record(latency_ms)
     
     def evaluate_model_performance(self, test_data: List[Dict]) -> Dict:
         """Comprehensive model evaluation"""
@@ -69,17 +75,19 @@ class ModelEvaluator:
     
     def generate_performance_report(self) -> str:
         """Generate performance analysis report"""
-        if not self.latency_history:
+        if not self.latency_histogram.count:
             return "No performance data available"
         
-        avg_latency = statistics.mean(self.latency_history)
-        p95_latency = statistics.quantiles(self.latency_history, n=20)[18] if len(self.latency_history) > 20 else max(self.latency_history)
+        avg_latency = self.latency_histogram.mean()
+        percentiles = self.latency_histogram.quantiles((0.5, 0.95, 0.99))
         
         report = f"""
 === Model Performance Report ===
-Total Translations: {len(self.latency_history)}
+Total Translations: {self.latency_histogram.count}
 Average Latency: {avg_latency:.2f}ms
-P95 Latency: {p95_latency:.2f}ms
+P50 Latency: {percentiles["p50"]:.2f}ms
+P95 Latency: {percentiles["p95"]:.2f}ms
+P99 Latency: {percentiles["p99"]:.2f}ms
 Target Latency: <500ms (Real-time requirement)
 Status: {'✓ PASS' if avg_latency < 500 else '✗ FAIL'}
         """
@@ -0,0 +1,33 @@
+import json
+from typing import Any, Dict
+
+try:
+    import orjson
+
+    def encode_frame(payload: Dict[str, Any]) -> str:
+        """Serialize a websocket frame once so the same str can go to many sockets"""
+        return orjson.dumps(payload).decode()
+
+    JSON_ENCODER = "orjson"
+except ImportError:
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+    def encode_frame(payload: Dict[str, Any]) -> str:
+        """Serialize a websocket frame once so the same str can go to many sockets"""
+        return _encoder.encode(payload)
+
+    JSON_ENCODER = "json"
+
+
+# Status frames with no per-message fields are encoded once at import time
+LOADING_MODEL_FRAME = encode_frame({
+    "type": "status",
+    "status": "loading_model",
+    "content": "Initializing translation model (this may take a few seconds)..."
+})
+
+MODEL_LOADED_FRAME = encode_frame({
+    "type": "status",
+    "status": "loaded",
+    "content": "Model Loaded"
+})
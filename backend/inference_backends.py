@@ -0,0 +1,70 @@
+import logging
+import torch
+from typing import Dict, Type
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceBackend:
+    """Prepares a loaded seq2seq model for inference (precision, kernels) before it serves requests"""
+
+    name = "base"
+
+    def prepare(self, model, device: str):
+        raise NotImplementedError
+
+    def describe(self) -> Dict[str, object]:
+        return {"backend": self.name}
+
+
+class EagerBackend(InferenceBackend):
+    """Full-precision torch eager execution (the original behaviour)"""
+
+    name = "eager"
+
+    def prepare(self, model, device: str):
+        return model.to(device)
+
+
+class DynamicInt8Backend(InferenceBackend):
+    """
+    Dynamic int8 quantization of every nn.Linear: weights are stored as int8 and
+    activations are quantized on the fly. CPU only; on CUDA this falls back to eager.
+    """
+
+    name = "int8"
+
+    def prepare(self, model, device: str):
+        if device != "cpu":
+            logger.warning("int8 dynamic quantization is CPU-only; using eager on %s", device)
+            return model.to(device)
+        # In place, so the fp32 and int8 copies never coexist in memory
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+BACKENDS: Dict[str, Type[InferenceBackend]] = {
+    EagerBackend.name: EagerBackend,
+    DynamicInt8Backend.name: DynamicInt8Backend,
+}
+
+
+def get_backend(name: str) -> InferenceBackend:
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown inference backend {name!r} (choose from {', '.join(BACKENDS)})")
+
+
+def configure_torch_threads(intra_op_threads: int = 0, inter_op_threads: int = 0):
+    """
+    Set torch's thread pools (0 keeps torch's default). The intra-op count is shared by
+    every inference worker thread in the process, so size it as cores / INFERENCE_WORKERS.
+    """
+    if intra_op_threads > 0:
+        torch.set_num_threads(intra_op_threads)
+    if inter_op_threads > 0:
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError as e:
+            # Can only be set once, before any inter-op parallel work has started
+            logger.warning("Could not set inter-op threads: %s", e)
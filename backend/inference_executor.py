@@ -0,0 +1,74 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from scalability_config import config
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference pool cannot accept more work"""
+
+
+class InferenceExecutor:
+    """
+    Bounded worker pool that runs blocking model inference off the asyncio event loop.
+    Threads are used because torch releases the GIL during inference and the
+    model weights can then be shared instead of copied into every process.
+    """
+
+    def __init__(self, max_workers: int = 1, max_queue_depth: int = 32):
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Only touched from the event loop thread, so no lock is needed
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="inference"
+            )
+        return self._executor
+
+    def is_full(self) -> bool:
+        return self.in_flight >= self.max_workers + self.max_queue_depth
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run func in the pool, raising InferenceQueueFull instead of queueing unbounded work"""
+        if self.is_full():
+            self.rejected += 1
+            raise InferenceQueueFull(
+                f"Inference queue full ({self.in_flight} in flight, capacity {self.max_workers + self.max_queue_depth})"
+            )
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), functools.partial(func, *args, **kwargs))
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.max_workers,
+            "max_queue_depth": self.max_queue_depth,
+            "in_flight": self.in_flight,
+            "queued": max(0, self.in_flight - self.max_workers),
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+inference_executor = InferenceExecutor(
+    max_workers=config.inference_workers,
+    max_queue_depth=config.inference_queue_depth
+)
@@ -0,0 +1,140 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+from languages import NLLB_LANGUAGES
+
+# Stages of the chat hot path, in pipeline order:
+#   receive   - whole inbound message handling, from receive_text returning until the
+#               broadcast has queued every frame (encloses the stages below)
+#   parse     - json.loads of the inbound frame
+#   sanitize  - privacy_service.sanitize_message
+#   queue     - waiting in the batch scheduler and inference executor
+#   tokenize / generate / decode - model work inside TranslationService
+#   serialize - encoding the outbound frame for a language group
+#   send      - websocket send_text for one frame
+STAGES = ("receive", "parse", "sanitize", "queue", "tokenize", "generate", "decode", "serialize", "send")
+
+# Histogram bucket upper bounds in milliseconds (exported to Prometheus in seconds)
+DEFAULT_BUCKETS_MS = (0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+NO_LANG = "none"
+# Label for language values that aren't NLLB codes (they come from clients), keeping series bounded
+OTHER_LANG = "other"
+
+
+def lang_label(lang: str) -> str:
+    return lang if lang in NLLB_LANGUAGES or lang == NO_LANG else OTHER_LANG
+
+
+def escape_label_value(value: str) -> str:
+    """Escape a Prometheus label value (backslash, double quote and newline)"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class StageHistogram:
+    """Cumulative-bucket histogram for one (stage, source_lang, target_lang) series"""
+
+    __slots__ = ("counts", "count", "total_ms")
+
+    def __init__(self, bucket_count: int):
+        self.counts = [0] * bucket_count
+        self.count = 0
+        self.total_ms = 0.0
+
+
+class StageMetrics:
+    """
+    Per-stage timing spans labelled by language pair, exported in Prometheus text format.
+    Observations come from both the event loop and inference threads, so updates take
+    a short uncontended lock.
+    """
+
+    def __init__(self, buckets_ms: Tuple[float, ...] = DEFAULT_BUCKETS_MS, enabled: bool = True):
+        self.buckets_ms = buckets_ms
+        self.enabled = enabled
+        self._series: Dict[Tuple[str, str, str], StageHistogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, duration_ms: float, source_lang: str = NO_LANG, target_lang: str = NO_LANG):
+        if not self.enabled:
+            return
+        key = (stage, lang_label(source_lang), lang_label(target_lang))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = StageHistogram(len(self.buckets_ms))
+            for i, upper_bound in enumerate(self.buckets_ms):
+                if duration_ms <= upper_bound:
+                    series.counts[i] += 1
+                    break
+            series.count += 1
+            series.total_ms += duration_ms
+
+    @contextmanager
+    def span(self, stage: str, source_lang: str = NO_LANG, target_lang: str = NO_LANG):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, (time.perf_counter() - start) * 1000, source_lang, target_lang)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Count and mean per series, keyed "stage source->target" (for JSON reports)"""
+        with self._lock:
+            return {
+                f"{stage} {source_lang}->{target_lang}": {
+                    "count": series.count,
+                    "mean_ms": series.total_ms / series.count if series.count else 0.0
+                }
+                for (stage, source_lang, target_lang), series in self._series.items()
+            }
+
+    def render_prometheus(self, metric_name: str = "chat_stage_duration_seconds") -> List[str]:
+        """Histogram lines in Prometheus base units: bucket bounds and _sum are in seconds"""
+        lines = [
+            f"# HELP {metric_name} Time spent in each chat pipeline stage, in seconds.",
+            f"# TYPE {metric_name} histogram"
+        ]
+        with self._lock:
+            series_items = sorted(self._series.items())
+            for (stage, source_lang, target_lang), series in series_items:
+                labels = ",".join(
+                    f'{name}="{escape_label_value(value)}"'
+                    for name, value in (("stage", stage), ("source_lang", source_lang), ("target_lang", target_lang))
+                )
+                cumulative = 0
+                for upper_bound, bucket_count in zip(self.buckets_ms, series.counts):
+                    cumulative += bucket_count
+                    lines.append(f'{metric_name}_bucket{{{labels},le="{upper_bound / 1000:g}"}} {cumulative}')
+                lines.append(f'{metric_name}_bucket{{{labels},le="+Inf"}} {series.count}')
+                lines.append(f"{metric_name}_sum{{{labels}}} {series.total_ms / 1000:.9f}")
+                lines.append(f"{metric_name}_count{{{labels}}} {series.count}")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+def render_gauges(gauges: Dict[str, Tuple[str, float]]) -> List[str]:
+    """Prometheus lines for simple unlabelled gauges: {name: (help, value)}"""
+    lines = []
+    for name, (help_text, value) in gauges.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+    return lines
+
+
+def render_counters(counters: Dict[str, Tuple[str, float]]) -> List[str]:
+    """Prometheus lines for unlabelled monotonic counters: {name: (help, value)}; names end in _total"""
+    lines = []
+    for name, (help_text, value) in counters.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name} {value}")
+    return lines
+
+
+stage_metrics = StageMetrics()
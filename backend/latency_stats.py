@@ -0,0 +1,113 @@
+import math
+from typing import Dict, List, Optional
+
+
+class LatencyHistogram:
+    """
+    Fixed-memory streaming histogram for latency quantiles (HDR-style log buckets).
+
+    Bucket i covers [min_ms * growth**i, min_ms * growth**(i+1)), so any quantile is
+    reported within relative_error of the true value. Recording is O(1); a quantile
+    read scans the fixed bucket array, independent of how many samples were recorded.
+    """
+
+    def __init__(self, min_ms: float = 0.1, max_ms: float = 600000.0, relative_error: float = 0.01):
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.relative_error = relative_error
+        self._log_growth = math.log1p(relative_error)
+        self.bucket_count = int(math.ceil(math.log(max_ms / min_ms) / self._log_growth)) + 1
+        self._counts: List[int] = [0] * self.bucket_count
+
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_seen: Optional[float] = None
+        self.max_seen: Optional[float] = None
+
+    def _bucket_index(self, value_ms: float) -> int:
+        if value_ms <= self.min_ms:
+            return 0
+        index = int(math.log(value_ms / self.min_ms) / self._log_growth)
+        return min(index, self.bucket_count - 1)
+
+    def _bucket_value(self, index: int) -> float:
+        # Geometric midpoint of the bucket keeps the error symmetric
+        return self.min_ms * math.exp((index + 0.5) * self._log_growth)
+
+    def record(self, value_ms: float):
+        self._counts[self._bucket_index(value_ms)] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        self.min_seen = value_ms if self.min_seen is None else min(self.min_seen, value_ms)
+        self.max_seen = value_ms if self.max_seen is None else max(self.max_seen, value_ms)
+
+    def mean(self) -> float:
+        return self.total_ms / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Approximate q-quantile (0 <= q <= 1), clamped to the observed min/max"""
+        if not self.count:
+            return 0.0
+        rank = max(1, int(math.ceil(q * self.count)))
+        seen = 0
+        for index, bucket_count in enumerate(self._counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(max(self._bucket_value(index), self.min_seen), self.max_seen)
+        return self.max_seen
+
+    def quantiles(self, qs=(0.5, 0.95, 0.99)) -> Dict[str, float]:
+        """Several quantiles in one scan, keyed like {"p50": ..., "p95": ...}"""
+        result = {f"p{round(q * 100):g}": 0.0 for q in qs}
+        if not self.count:
+            return result
+        ranks = sorted((max(1, int(math.ceil(q * self.count))), f"p{round(q * 100):g}") for q in qs)
+        seen = 0
+        next_rank = 0
+        for index, bucket_count in enumerate(self._counts):
+            seen += bucket_count
+            while next_rank < len(ranks) and seen >= ranks[next_rank][0]:
+                result[ranks[next_rank][1]] = min(max(self._bucket_value(index), self.min_seen), self.max_seen)
+                next_rank += 1
+            if next_rank == len(ranks):
+                break
+        return result
+
+    def reset(self):
+        self._counts = [0] * self.bucket_count
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_seen = None
+        self.max_seen = None
+
+
+class LatencyRing:
+    """Sliding window over the most recent samples with an O(1) running mean"""
+
+    def __init__(self, size: int = 10):
+        self.size = size
+        self._values: List[float] = [0.0] * size
+        self._next = 0
+        self.filled = 0
+        self._sum = 0.0
+
+    def record(self, value_ms: float):
+        if self.filled == self.size:
+            self._sum -= self._values[self._next]
+        else:
+            self.filled += 1
+        self._values[self._next] = value_ms
+        self._sum += value_ms
+        self._next = (self._next + 1) % self.size
+
+    def mean(self) -> float:
+        return self._sum / self.filled if self.filled else 0.0
+
+    def values(self) -> List[float]:
+        """Samples in the window, oldest first"""
+        if self.filled < self.size:
+            return self._values[:self.filled]
+        return self._values[self._next:] + self._values[:self._next]
+
+    def __len__(self) -> int:
+        return self.filled
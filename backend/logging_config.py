@@ -0,0 +1,131 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from typing import Dict, Optional
+from scalability_config import config
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+LOG_QUEUE_SIZE = 10000
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["DroppingQueueHandler"] = None
+_sample_rate = config.log_sample_rate
+_log_message_content = config.log_message_content
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread without blocking the caller.
+    If the writer falls behind and the queue fills up, new records are dropped and counted.
+    """
+
+    def __init__(self, log_queue: "queue.Queue"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RedactedText:
+    """
+    Stands in for chat content in log arguments. Only the length is shown unless
+    LOG_MESSAGE_CONTENT=true; nothing is rendered unless the record is emitted.
+    """
+
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+    def __str__(self) -> str:
+        text = self.text if isinstance(self.text, str) else str(self.text)
+        if _log_message_content:
+            return ascii(text)
+        return f"<{len(text)} chars>"
+
+
+def redact(text) -> RedactedText:
+    return RedactedText(text)
+
+
+def log_sampled(logger: logging.Logger, level: int, msg: str, *args):
+    """Log a per-message line for only a LOG_SAMPLE_RATE fraction of calls"""
+    if logger.isEnabledFor(level) and random.random() < _sample_rate:
+        logger.log(level, msg, *args)
+
+
+def debug_sampled(logger: logging.Logger, msg: str, *args):
+    log_sampled(logger, logging.DEBUG, msg, *args)
+
+
+def parse_module_levels(spec: str) -> Dict[str, int]:
+    """Parse "socket_manager=DEBUG,translation_service=WARNING" into {logger name: level}"""
+    levels = {}
+    for item in spec.split(","):
+        name, sep, level_name = item.partition("=")
+        name, level_name = name.strip(), level_name.strip().upper()
+        if not sep or not name:
+            continue
+        level = logging.getLevelName(level_name)
+        if isinstance(level, int):
+            levels[name] = level
+    return levels
+
+
+def setup_logging(
+    level: Optional[str] = None,
+    module_levels: Optional[str] = None,
+    sample_rate: Optional[float] = None,
+    stream=None
+) -> logging.handlers.QueueListener:
+    """
+    Route all logging through a queue drained by a background thread, so callers on the
+    event loop never wait on stdout. Safe to call more than once; only the first call configures.
+    """
+    global _listener, _queue_handler, _sample_rate
+    if _listener is not None:
+        return _listener
+
+    if sample_rate is not None:
+        _sample_rate = sample_rate
+
+    stream_handler = logging.StreamHandler(stream or sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.handlers = [_queue_handler]
+    root.setLevel(level or config.log_level)
+    for name, module_level in parse_module_levels(config.log_levels if module_levels is None else module_levels).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logging_stats() -> Dict[str, object]:
+    return {
+        "level": logging.getLevelName(logging.getLogger().level),
+        "sample_rate": _sample_rate,
+        "queued": _queue_handler.queue.qsize() if _queue_handler is not None else 0,
+        "dropped": _queue_handler.dropped if _queue_handler is not None else 0
+    }
@@ -1,18 +1,43 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from typing import List, Optional
 import json
 import time
 import asyncio
+import logging
+from logging_config import setup_logging, debug_sampled, log_sampled, redact, get_logging_stats
+# Configure before the modules below create their singletons (and may log while doing so)
+setup_logging()
 from socket_manager import manager
+from room_registry import DEFAULT_ROOM
 from privacy_service import privacy_service
+from inference_executor import InferenceQueueFull, inference_executor
+from batch_scheduler import translation_scheduler
+from translation_cache import translation_cache, shared_translation_cache
+from instrumentation import stage_metrics, render_counters, render_gauges
+from message_store import message_store
+from scalability_config import config
+from model_registry import model_registry
+from models import BatchTranslationRequest
+from batch_translation import iter_batch_results, translate_batch_in_order
+from frames import encode_frame
+from rate_limiter import WS_TRY_AGAIN_LATER, admission_controller
+from languages import is_supported
 try:
     from evaluation import evaluator
     EVALUATION_ENABLED = True
 except ImportError:
     EVALUATION_ENABLED = False
-    print("Warning: Evaluation module not available")
-# from .translation_service import TranslationService # Lazy load to avoid startup delay during install
+
+logger = logging.getLogger(__name__)
+
+# Close code for a connection asking for a language the model doesn't know
+WS_POLICY_VIOLATION = 1008
+if not EVALUATION_ENABLED:
+    logger.warning("Evaluation module not available")
+# torch/transformers are imported by model_registry when the model loads, never at import time
+# (check_import_time.py guards this)
 
 app = FastAPI()
 
@@ -24,36 +49,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global translation service instance (lazy loaded)
-translation_service = None
-
-def get_translation_service():
-    global translation_service
-    if translation_service is None:
-        from translation_service import TranslationService
-        translation_service = TranslationService()
-    return translation_service
-
-    return translation_service
-
-async def get_translation_service_async():
-    global translation_service
-    if translation_service is None:
-        loop = asyncio.get_event_loop()
-        from translation_service import TranslationService
-        # Run in executor to avoid blocking the event loop during model load
-        translation_service = await loop.run_in_executor(None, TranslationService)
-    return translation_service
-
-def is_model_loaded():
-    return translation_service is not None
+broker_listener_task = None
+history_expiry_task = None
 
 @app.on_event("startup")
 async def startup_event():
-    # Start Redis listener in background
-    # asyncio.create_task(manager.redis_listener())
-    pass # Commented out for MVP if Redis is not installed, to avoid errors.
-    # If Redis IS installed, uncomment above.
+    global broker_listener_task, history_expiry_task
+    message_store.load_segments()
+    # Drop expired history even when no messages arrive to trigger it
+    history_expiry_task = asyncio.create_task(message_store.expire_periodically())
+    if config.model_preload:
+        # Load and warm up the model in the background; /health reports readiness meanwhile
+        model_registry.start_loading()
+    # Receive messages published by other workers (Redis when REDIS_ENABLED=true)
+    broker_listener_task = asyncio.create_task(manager.broker_listener())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if broker_listener_task is not None:
+        broker_listener_task.cancel()
+    if history_expiry_task is not None:
+        history_expiry_task.cancel()
+    await manager.broker.close()
+    message_store.close()
 
 # @app.get("/")
 # async def root():
@@ -63,85 +81,255 @@ async def startup_event():
 async def get_metrics():
     """Get system performance metrics"""
     if EVALUATION_ENABLED:
-        return {
+        metrics = {
             "performance_report": evaluator.generate_performance_report(),
-            "total_translations": len(evaluator.latency_history),
-            "active_connections": len(manager.active_connections)
+            "total_translations": evaluator.latency_histogram.count,
+            "latency_percentiles_ms": evaluator.latency_histogram.quantiles((0.5, 0.95, 0.99))
         }
     else:
-        return {
+        metrics = {
             "performance_report": "Evaluation module not available",
-            "total_translations": 0,
-            "active_connections": len(manager.active_connections)
+            "total_translations": 0
         }
+    metrics.update({
+        "active_connections": manager.connection_count(),
+        "rooms": manager.rooms.get_stats(),
+        "connections": manager.get_connection_stats(),
+        "inference_queue": inference_executor.get_stats(),
+        "batching": translation_scheduler.get_stats(),
+        "translation_cache": translation_cache.get_stats(),
+        "shared_translation_cache": shared_translation_cache.get_stats(),
+        "logging": get_logging_stats(),
+        "pii_sanitizer": privacy_service.get_stats(),
+        "message_history": message_store.get_stats(),
+        "model": model_registry.get_status(),
+        "admission": admission_controller.get_stats()
+    })
+    return metrics
+
+@app.get("/metrics/prometheus", response_class=PlainTextResponse)
+async def get_prometheus_metrics():
+    """Per-stage timings by language pair plus key gauges, in Prometheus text format"""
+    lines = stage_metrics.render_prometheus()
+    lines += render_gauges({
+        "chat_active_connections": ("Websocket connections on this worker.", manager.connection_count()),
+        "chat_inference_in_flight": ("Translation batches running or queued for the inference pool.", inference_executor.in_flight),
+        "chat_translation_cache_entries": ("Entries in the local translation cache.", len(translation_cache))
+    })
+    lines += render_counters({
+        "chat_connections_rejected_total": ("Connections closed because the worker was at its cap.", admission_controller.connections_rejected),
+        "chat_messages_rate_limited_total": (
+            "Messages dropped by the per-client and per-room rate limits.",
+            admission_controller.client_limiter.rejected + admission_controller.room_limiter.rejected
+        )
+    })
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+@app.get("/rooms/{room}/history")
+async def get_room_history(room: str, limit: int = 50, before: Optional[float] = None, lang: Optional[str] = None):
+    """
+    Recent messages in a room, oldest first, for clients catching up after (re)connecting.
+    With lang, messages come back as chat frames translated into that language.
+    Pass next_before from the response as `before` to page further back.
+    """
+    limit = max(1, min(limit, config.history_max_page))
+    if lang:
+        _require_supported([lang])
+        return await manager.get_translated_history(room, lang, limit=limit, before=before)
+    page = message_store.get_history(room, limit=limit, before=before)
+    return {
+        "messages": [
+            {key: value for key, value in message.items() if key != "translations"}
+            for message in page["messages"]
+        ],
+        "next_before": page["next_before"]
+    }
+
+def _require_supported(langs):
+    unsupported = sorted({lang for lang in langs if not is_supported(lang)})
+    if unsupported:
+        raise HTTPException(status_code=422, detail=f"Unsupported language codes: {', '.join(unsupported)}")
+
+def _expand_batch_request(request: BatchTranslationRequest):
+    items = request.expand()
+    if len(items) > config.translate_batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"{len(items)} translations requested, limit is {config.translate_batch_max_items}; use smaller requests"
+        )
+    _require_supported(
+        [request.source_lang, *request.target_langs]
+        + [lang for item in request.items for lang in (item.source_lang, item.target_lang)]
+    )
+    return items
+
+@app.post("/translate/batch")
+async def translate_batch(request: BatchTranslationRequest):
+    """
+    Translate many texts into many languages in one call. Identical inputs are translated
+    once, batches are length-sorted to minimise padding, and results keep request order.
+    """
+    items = _expand_batch_request(request)
+    try:
+        translations = await translate_batch_in_order(items, translation_scheduler)
+    except InferenceQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {
+        "results": [
+            {
+                "text": item.text,
+                "source_lang": item.source_lang,
+                "target_lang": item.target_lang,
+                "translation": translation
+            }
+            for item, translation in zip(items, translations)
+        ]
+    }
+
+@app.post("/translate/batch/stream")
+async def translate_batch_stream(request: BatchTranslationRequest):
+    """
+    Same as /translate/batch, but streams one NDJSON line per result as each batch finishes.
+    Lines arrive in completion order; "index" is the position in the expanded request.
+    """
+    items = _expand_batch_request(request)
+
+    async def ndjson_lines():
+        try:
+            async for index, translation in iter_batch_results(items, translation_scheduler):
+                item = items[index]
+                yield encode_frame({
+                    "index": index,
+                    "text": item.text,
+                    "source_lang": item.source_lang,
+                    "target_lang": item.target_lang,
+                    "translation": translation
+                }) + "\n"
+        except InferenceQueueFull as e:
+            # Headers are already sent, so report the failure in-band and stop
+            yield encode_frame({"error": str(e), "status": 429}) + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint for load balancers"""
+    """Health check endpoint for load balancers (503 until the preloaded model is warmed up)"""
+    if config.model_preload and not model_registry.is_ready():
+        return JSONResponse(status_code=503, content={
+            "status": model_registry.state,
+            "model": model_registry.get_status(),
+            "active_connections": manager.connection_count()
+        })
     if EVALUATION_ENABLED:
-        avg_latency = sum(evaluator.latency_history[-10:]) / min(10, len(evaluator.latency_history)) if evaluator.latency_history else 0
+        avg_latency = evaluator.recent_latencies.mean()
         return {
-            "status": "healthy" if avg_latency < 500 else "degraded",
+            "status": "healthy" if avg_latency < config.max_latency_ms else "degraded",
             "avg_latency_ms": avg_latency,
-            "active_connections": len(manager.active_connections)
+            "model": model_registry.get_status(),
+            "active_connections": manager.connection_count()
         }
     else:
         return {
             "status": "healthy",
             "avg_latency_ms": 0,
-            "active_connections": len(manager.active_connections)
+            "model": model_registry.get_status(),
+            "active_connections": manager.connection_count()
         }
 
 @app.websocket("/ws/{client_id}")
-async def websocket_endpoint(websocket: WebSocket, client_id: str, lang: str = "eng_Latn"):
-    await manager.connect(websocket, client_id, lang)
-    
-    # Notify others that user joined
-    join_msg = {
-        "content": f"Client #{client_id} joined",
-        "sender": "System",
-        "original_lang": "eng_Latn",
-        "id": str(time.time())
-    }
-    await manager.broadcast(join_msg, exclude_client_id=client_id)
+async def websocket_endpoint(websocket: WebSocket, client_id: str, lang: str = "eng_Latn", stream: bool = False):
+    """Chat in the default room (kept for clients that don't pick a room)"""
+    await chat_session(websocket, DEFAULT_ROOM, client_id, lang, stream)
+
+@app.websocket("/ws/{room}/{client_id}")
+async def room_websocket_endpoint(websocket: WebSocket, room: str, client_id: str, lang: str = "eng_Latn", stream: bool = False):
+    """Chat in a named room; messages only reach members of that room"""
+    await chat_session(websocket, room, client_id, lang, stream)
+
+async def chat_session(websocket: WebSocket, room: str, client_id: str, lang: str, stream: bool = False):
+    if not is_supported(lang):
+        # The model can't translate to or from it, and it would label metrics
+        await websocket.accept()
+        await websocket.close(code=WS_POLICY_VIOLATION, reason="Unsupported language code")
+        return
+
+    if not admission_controller.reserve_connection(manager.connection_count()):
+        # Accept first so the client gets a close code it can back off on, not a failed handshake
+        await websocket.accept()
+        await websocket.close(code=WS_TRY_AGAIN_LATER, reason="Worker at connection capacity")
+        log_sampled(logger, logging.WARNING, "Connection cap of %d reached, rejected a client", admission_controller.max_connections)
+        return
 
     try:
+        # stream=true: receive translation_delta frames while a translation is generated
+        connection = await manager.connect(websocket, client_id, lang, room=room, streaming=stream)
+    finally:
+        # Once joined, the connection is counted as a room member instead
+        admission_controller.release_connection()
+
+    try:
+        # Notify others that user joined (system messages only ever carry the anonymized id)
+        join_msg = {
+            "content": f"Client #{connection.anonymized_id} joined",
+            "sender": "System",
+            "original_lang": "eng_Latn",
+            "id": manager.new_message_id()
+        }
+        await manager.broadcast(join_msg, exclude_client_id=client_id, room=room)
+
         while True:
             data = await websocket.receive_text()
+            received_at = time.perf_counter()
             # Expecting JSON: {"content": "Hello", "target_lang": "spa_Latn"}
             # For MVP, we might just receive text and assume a default target or parse it.
             
             # Let's assume the client sends a JSON string
-            try:
-                message_data = json.loads(data)
-                content = message_data.get("content")
-                # target_lang is now determined by the receiver's preference, not the sender
-            except json.JSONDecodeError:
-                # Fallback for plain text
-                content = data
+            with stage_metrics.span("parse", lang):
+                try:
+                    message_data = json.loads(data)
+                    # Valid JSON that isn't an object (e.g. 123) carries no message
+                    content = message_data.get("content") if isinstance(message_data, dict) else None
+                    # target_lang is now determined by the receiver's preference, not the sender
+                except json.JSONDecodeError:
+                    # Fallback for plain text
+                    content = data
+
+            # Frames without text (e.g. {"type": "typing"}) are not chat messages
+            if not isinstance(content, str) or not content:
+                continue
+
+            # Admission: drop oversized or rate-limited messages before any sanitizing or translation
+            rejection = admission_controller.check_message(client_id, room, content)
+            if rejection is not None:
+                connection.enqueue(encode_frame(rejection))
+                continue
 
             # Privacy: Sanitize message content
-            content = privacy_service.sanitize_message(content)
-            anonymized_client_id = privacy_service.anonymize_user_id(client_id)
+            with stage_metrics.span("sanitize", lang):
+                content = privacy_service.sanitize_message(content)
             
             # Prepare message for broadcast
             broadcast_data = {
                 "content": content,
-                "sender": anonymized_client_id,
+                "sender": connection.anonymized_id,
                 "original_lang": lang, # The sender's language
-                "id": str(time.time()) # Simple ID
+                "id": manager.new_message_id()
             }
             
-            print(f"Received from {client_id}: {content}. Broadcasting...")
-            # Broadcast to all (manager handles individual translation)
-            await manager.broadcast(broadcast_data, exclude_client_id=client_id)
+            debug_sampled(logger, "Received from %s in %s: %s. Broadcasting...", connection.anonymized_id, room, redact(content))
+            # Broadcast to the room (manager handles per-language translation)
+            await manager.broadcast(broadcast_data, exclude_client_id=client_id, room=room)
+            stage_metrics.observe("receive", (time.perf_counter() - received_at) * 1000, lang)
             
     except WebSocketDisconnect:
-        manager.disconnect(client_id, websocket)
+        pass
+    finally:
+        # Always leave the room, whatever ended the session, so no ghost member holds a connection slot
+        await manager.disconnect(client_id, websocket, room=room)
         disconnect_msg = {
-            "content": f"Client #{client_id} left",
+            "content": f"Client #{connection.anonymized_id} left",
             "sender": "System",
             "original_lang": "eng_Latn",
-            "id": str(time.time())
+            "id": manager.new_message_id()
         }
-        await manager.broadcast(disconnect_msg)
+        await manager.broadcast(disconnect_msg, room=room)
@@ -0,0 +1,89 @@
+import asyncio
+from typing import AsyncIterator, Dict, Optional, Set, Tuple
+
+
+class InMemoryHub:
+    """Shared bus connecting InMemoryBroker instances, standing in for a Redis server"""
+
+    def __init__(self):
+        self.subscribers: Dict[str, Set["InMemoryBroker"]] = {}
+
+    def publish(self, channel: str, payload: str) -> int:
+        receivers = self.subscribers.get(channel, ())
+        for broker in receivers:
+            broker.queue.put_nowait((channel, payload))
+        return len(receivers)
+
+
+class InMemoryBroker:
+    """
+    Pub/sub broker for a single process or for tests.
+    Several brokers sharing one InMemoryHub behave like workers sharing a Redis server.
+    """
+
+    def __init__(self, hub: Optional[InMemoryHub] = None):
+        self.hub = hub or InMemoryHub()
+        self.queue: "asyncio.Queue[Tuple[str, str]]" = asyncio.Queue()
+        self.channels: Set[str] = set()
+
+    async def publish(self, channel: str, payload: str):
+        self.hub.publish(channel, payload)
+
+    async def subscribe(self, *channels: str):
+        for channel in channels:
+            self.hub.subscribers.setdefault(channel, set()).add(self)
+            self.channels.add(channel)
+
+    async def unsubscribe(self, *channels: str):
+        for channel in channels:
+            subscribers = self.hub.subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(self)
+                if not subscribers:
+                    del self.hub.subscribers[channel]
+            self.channels.discard(channel)
+
+    async def listen(self) -> AsyncIterator[Tuple[str, str]]:
+        while True:
+            channel, payload = await self.queue.get()
+            # Drop anything that was queued before an unsubscribe
+            if channel in self.channels:
+                yield channel, payload
+
+    async def close(self):
+        await self.unsubscribe(*list(self.channels))
+
+
+class RedisBroker:
+    """Pub/sub broker on a redis.asyncio client, used to fan messages out across workers"""
+
+    def __init__(self, client, poll_timeout: float = 1.0):
+        self.client = client
+        self.pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self.poll_timeout = poll_timeout
+        self.channels: Set[str] = set()
+
+    async def publish(self, channel: str, payload: str):
+        await self.client.publish(channel, payload)
+
+    async def subscribe(self, *channels: str):
+        await self.pubsub.subscribe(*channels)
+        self.channels.update(channels)
+
+    async def unsubscribe(self, *channels: str):
+        await self.pubsub.unsubscribe(*channels)
+        self.channels.difference_update(channels)
+
+    async def listen(self) -> AsyncIterator[Tuple[str, str]]:
+        # get_message() is polled instead of pubsub.listen(), which returns as soon
+        # as there are no subscriptions and so can't follow subscribe/unsubscribe
+        while True:
+            if not self.channels:
+                await asyncio.sleep(self.poll_timeout)
+                continue
+            message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=self.poll_timeout)
+            if message and message["type"] == "message":
+                yield message["channel"], message["data"]
+
+    async def close(self):
+        await self.pubsub.close()
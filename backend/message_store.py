@@ -0,0 +1,291 @@
+import asyncio
+import bisect
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from typing import Dict, List, Optional
+from frames import encode_frame
+from scalability_config import config
+
+logger = logging.getLogger(__name__)
+
+# Segment records are a 4-byte big-endian length followed by one JSON message
+RECORD_HEADER = struct.Struct(">I")
+SEGMENT_SUFFIX = ".seg"
+
+
+class Bucket:
+    """Messages whose timestamp falls in one bucket_seconds window"""
+
+    __slots__ = ("rooms", "by_id")
+
+    def __init__(self):
+        # {room: [message, ...]} sorted by timestamp
+        self.rooms: Dict[str, List[dict]] = {}
+        self.by_id: Dict[str, dict] = {}
+
+
+class SegmentLog:
+    """
+    Append-only on-disk copy of the store, one segment file per bucket.
+    Expiring a bucket deletes its file; segments are read back through mmap on startup.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._bucket_id: Optional[int] = None
+        self._file = None
+
+    def _path(self, bucket_id: int) -> str:
+        return os.path.join(self.directory, f"{bucket_id}{SEGMENT_SUFFIX}")
+
+    def append(self, bucket_id: int, message: dict):
+        if bucket_id != self._bucket_id:
+            self.close()
+            self._file = open(self._path(bucket_id), "ab")
+            self._bucket_id = bucket_id
+        payload = encode_frame(message).encode()
+        self._file.write(RECORD_HEADER.pack(len(payload)) + payload)
+        self._file.flush()
+
+    def bucket_ids(self) -> List[int]:
+        bucket_ids = []
+        for name in os.listdir(self.directory):
+            stem, suffix = os.path.splitext(name)
+            if suffix == SEGMENT_SUFFIX and stem.lstrip("-").isdigit():
+                bucket_ids.append(int(stem))
+        return sorted(bucket_ids)
+
+    def read(self, bucket_id: int) -> List[dict]:
+        path = self._path(bucket_id)
+        if os.path.getsize(path) == 0:
+            return []
+        messages = []
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            offset = 0
+            while offset + RECORD_HEADER.size <= len(data):
+                (length,) = RECORD_HEADER.unpack_from(data, offset)
+                start = offset + RECORD_HEADER.size
+                if start + length > len(data):
+                    # Torn write at the tail (crash mid-append); the rest of the file is unusable
+                    logger.warning("Truncated record in segment %s", path)
+                    break
+                try:
+                    messages.append(json.loads(data[start:start + length]))
+                except ValueError:
+                    logger.warning("Skipping corrupt record in segment %s", path)
+                offset = start + length
+        return messages
+
+    def delete(self, bucket_id: int):
+        if bucket_id == self._bucket_id:
+            self.close()
+        try:
+            os.remove(self._path(bucket_id))
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._bucket_id = None
+
+
+class MessageStore:
+    """
+    Chat history kept for retention_hours, sharded into time buckets (one hour by default).
+
+    Expiry never scans messages: whole buckets older than the retention window are
+    dropped from the front of the sorted bucket list. A bucket can outlive the window
+    by up to bucket_seconds, so reads also filter on the timestamp.
+    """
+
+    def __init__(self, retention_hours: float = 24, bucket_seconds: int = 3600, segment_dir: Optional[str] = None):
+        self.retention_seconds = retention_hours * 3600
+        self.bucket_seconds = bucket_seconds
+        self._buckets: Dict[int, Bucket] = {}
+        self._bucket_ids: List[int] = []
+        self._latest_bucket_id: Optional[int] = None
+        self.segments = SegmentLog(segment_dir) if segment_dir else None
+
+        self.stored = 0
+        self.expired_buckets = 0
+
+    def _bucket_id(self, timestamp: float) -> int:
+        return int(timestamp // self.bucket_seconds)
+
+    def _get_bucket(self, bucket_id: int) -> Bucket:
+        bucket = self._buckets.get(bucket_id)
+        if bucket is None:
+            bucket = self._buckets[bucket_id] = Bucket()
+            bisect.insort(self._bucket_ids, bucket_id)
+        return bucket
+
+    def _insert(self, bucket_id: int, message: dict):
+        bucket = self._get_bucket(bucket_id)
+        room_messages = bucket.rooms.setdefault(message["room"], [])
+        # Messages from other workers can arrive slightly out of order
+        if room_messages and room_messages[-1]["timestamp"] > message["timestamp"]:
+            timestamps = [m["timestamp"] for m in room_messages]
+            room_messages.insert(bisect.bisect_right(timestamps, message["timestamp"]), message)
+        else:
+            room_messages.append(message)
+        bucket.by_id[message["id"]] = message
+
+    def add(self, room: str, message_data: dict) -> Optional[dict]:
+        """Store a chat message; returns the stored record, or None if it has no text or is already expired or stored"""
+        timestamp = message_data.get("timestamp") or time.time()
+        message_id = message_data.get("id")
+        content = message_data.get("content")
+        # Replays translate every stored text, so anything but a non-empty string would break history
+        if not isinstance(content, str) or not content:
+            return None
+        if not message_id or timestamp < time.time() - self.retention_seconds or self.get(message_id) is not None:
+            return None
+
+        bucket_id = self._bucket_id(timestamp)
+        if self._latest_bucket_id is None or bucket_id > self._latest_bucket_id:
+            # Expiry only has work to do when the clock moves into a new bucket
+            self._latest_bucket_id = bucket_id
+            self.expire()
+
+        message = {
+            "id": message_id,
+            "room": room,
+            "content": content,
+            "sender": message_data.get("sender", "unknown"),
+            "original_lang": message_data.get("original_lang", "eng_Latn"),
+            "timestamp": timestamp,
+            # {lang: text}, filled in as the message is translated for each audience
+            "translations": {}
+        }
+        self._insert(bucket_id, message)
+        if self.segments is not None:
+            try:
+                self.segments.append(bucket_id, message)
+            except OSError as e:
+                logger.warning("Could not append message to history segment: %s", e)
+        self.stored += 1
+        return message
+
+    def get(self, message_id: str) -> Optional[dict]:
+        # Newest buckets first: lookups are almost always for recent messages
+        for bucket_id in reversed(self._bucket_ids):
+            message = self._buckets[bucket_id].by_id.get(message_id)
+            if message is not None:
+                return message
+        return None
+
+    def add_translation(self, message_id: str, lang: str, text: str):
+        """Remember a translation of a stored message so history replays can reuse it"""
+        message = self.get(message_id)
+        if message is not None:
+            message["translations"][lang] = text
+
+    def get_history(self, room: str, limit: int = 50, before: Optional[float] = None) -> Dict[str, object]:
+        """
+        Newest `limit` messages in room older than `before` (a timestamp), oldest first.
+        Pass the returned next_before to fetch the page before this one; it is None on the last page.
+        """
+        self.expire()
+        cutoff = time.time() - self.retention_seconds
+        newest_first: List[dict] = []
+        more = False
+        first_bucket = self._bucket_id(before) if before is not None else None
+
+        for bucket_id in reversed(self._bucket_ids):
+            if first_bucket is not None and bucket_id > first_bucket:
+                continue
+            for message in reversed(self._buckets[bucket_id].rooms.get(room, ())):
+                if before is not None and message["timestamp"] >= before:
+                    continue
+                if message["timestamp"] < cutoff:
+                    break
+                if len(newest_first) == limit:
+                    more = True
+                    break
+                newest_first.append(message)
+            if more:
+                break
+
+        messages = newest_first[::-1]
+        return {
+            "messages": messages,
+            "next_before": messages[0]["timestamp"] if more and messages else None
+        }
+
+    def expire(self, now: Optional[float] = None):
+        """Drop every bucket that ends before the retention window starts"""
+        now = time.time() if now is None else now
+        oldest_kept = self._bucket_id(now - self.retention_seconds)
+        while self._bucket_ids and self._bucket_ids[0] < oldest_kept:
+            bucket_id = self._bucket_ids.pop(0)
+            del self._buckets[bucket_id]
+            if self.segments is not None:
+                self.segments.delete(bucket_id)
+            self.expired_buckets += 1
+
+    async def expire_periodically(self):
+        """
+        Background task expiring buckets once per bucket_seconds, so quiet rooms and idle
+        workers don't keep history (and its segment files) past the retention window.
+        Started on app startup.
+        """
+        while True:
+            await asyncio.sleep(self.bucket_seconds)
+            try:
+                self.expire()
+            except Exception as e:
+                logger.warning("History expiry failed: %s", e)
+
+    def load_segments(self):
+        """Rebuild the in-memory store from on-disk segments (call once at startup)"""
+        if self.segments is None:
+            return
+        oldest_kept = self._bucket_id(time.time() - self.retention_seconds)
+        loaded = 0
+        for bucket_id in self.segments.bucket_ids():
+            if bucket_id < oldest_kept:
+                self.segments.delete(bucket_id)
+                continue
+            for message in self.segments.read(bucket_id):
+                if (
+                    message.get("id") and message.get("room") and isinstance(message.get("content"), str)
+                    and message["content"] and self.get(message["id"]) is None
+                ):
+                    message.setdefault("translations", {})
+                    self._insert(bucket_id, message)
+                    loaded += 1
+            if self._latest_bucket_id is None or bucket_id > self._latest_bucket_id:
+                self._latest_bucket_id = bucket_id
+        logger.info("Loaded %d messages from history segments", loaded)
+
+    def __len__(self) -> int:
+        return sum(len(bucket.by_id) for bucket in self._buckets.values())
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "messages": len(self),
+            "buckets": len(self._bucket_ids),
+            "bucket_seconds": self.bucket_seconds,
+            "retention_hours": self.retention_seconds / 3600,
+            "stored": self.stored,
+            "expired_buckets": self.expired_buckets,
+            "persistent": self.segments is not None
+        }
+
+    def close(self):
+        if self.segments is not None:
+            self.segments.close()
+
+
+message_store = MessageStore(
+    retention_hours=config.message_retention_hours,
+    bucket_seconds=config.history_bucket_seconds,
+    segment_dir=config.history_segment_dir or None
+)
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from scalability_config import config
+
+logger = logging.getLogger(__name__)
+
+# Long enough to exercise attention over a few tokens, and not a greeting shortcut
+WARMUP_TEXT = "Thanks for the update, see you at the meeting tomorrow."
+
+
+def parse_language_pairs(spec: str) -> List[Tuple[str, str]]:
+    """Parse "eng_Latn:spa_Latn,eng_Latn:fra_Latn" into [(source, target), ...]"""
+    pairs = []
+    for item in spec.split(","):
+        source_lang, sep, target_lang = item.strip().partition(":")
+        if sep and source_lang and target_lang:
+            pairs.append((source_lang, target_lang))
+    return pairs
+
+
+def _create_translation_service():
+    from translation_service import TranslationService  # Heavy import, deferred until loading
+    return TranslationService()
+
+
+class ModelRegistry:
+    """
+    Owns the process-wide TranslationService so the chat server, the batch scheduler
+    and the evaluator all share one copy of the model.
+
+    start_loading() loads it on a background thread, then runs warm-up generations for
+    warmup_pairs so the first real messages don't pay for lazy initialisation.
+    State goes unloaded -> loading -> warming_up -> ready (or failed).
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], object] = _create_translation_service,
+        warmup_pairs: Optional[List[Tuple[str, str]]] = None
+    ):
+        self.factory = factory
+        self.warmup_pairs = warmup_pairs or []
+        self.service = None
+        self.state = "unloaded"
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+
+        self._lock = threading.Lock()
+        self._load_task: Optional[asyncio.Task] = None
+        self._loaded: Optional[asyncio.Event] = None
+
+    def get(self):
+        """Return the shared service, loading it on the calling thread if needed"""
+        return self._load("ready")
+
+    def _load(self, loaded_state: str):
+        if self.service is not None:
+            return self.service
+        with self._lock:
+            if self.service is None:
+                self.state = "loading"
+                self.error = None
+                started = time.perf_counter()
+                try:
+                    service = self.factory()
+                except Exception as e:
+                    self.state = "failed"
+                    self.error = str(e)
+                    raise
+                self.load_seconds = time.perf_counter() - started
+                self.service = service
+                self.state = loaded_state
+        return self.service
+
+    def start_loading(self) -> asyncio.Task:
+        """Begin loading and warming up in the background (idempotent while it is running)"""
+        if self._loaded is None:
+            self._loaded = asyncio.Event()
+        if self._load_task is None or (self._load_task.done() and self.service is None):
+            self._load_task = asyncio.create_task(self._load_in_background())
+        return self._load_task
+
+    async def _load_in_background(self):
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self._load, "warming_up" if self.warmup_pairs else "ready")
+        except Exception as e:
+            logger.error("Model load failed: %s", e)
+            return
+        finally:
+            # Wake waiters either way; they check self.service
+            self._loaded.set()
+
+        if self.state == "warming_up":
+            await loop.run_in_executor(None, self._warm_up)
+            self.state = "ready"
+
+    def _warm_up(self):
+        started = time.perf_counter()
+        for source_lang, target_lang in self.warmup_pairs:
+            try:
+                self.service.translate_batch([WARMUP_TEXT], source_lang, target_lang)
+            except Exception as e:
+                logger.warning("Warm-up %s -> %s failed: %s", source_lang, target_lang, e)
+        self.warmup_seconds = time.perf_counter() - started
+        logger.info("Model warmed up for %d language pairs in %.2fs", len(self.warmup_pairs), self.warmup_seconds)
+
+    async def get_async(self):
+        """Return the shared service, waiting for (or starting) the background load"""
+        if self.service is not None:
+            return self.service
+        self.start_loading()
+        await self._loaded.wait()
+        if self.service is None:
+            # Let the next caller retry
+            self._loaded.clear()
+            raise RuntimeError(f"Translation model failed to load: {self.error}")
+        return self.service
+
+    def is_loaded(self) -> bool:
+        return self.service is not None
+
+    def is_ready(self) -> bool:
+        return self.state == "ready"
+
+    def get_status(self) -> Dict[str, object]:
+        return {
+            "state": self.state,
+            "model": getattr(self.service, "model_name", None),
+            "backend": getattr(getattr(self.service, "backend", None), "name", None),
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "warmup_pairs": [f"{source_lang}:{target_lang}" for source_lang, target_lang in self.warmup_pairs],
+            "error": self.error
+        }
+
+
+model_registry = ModelRegistry(warmup_pairs=parse_language_pairs(config.model_warmup_pairs))
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 class Message(BaseModel):
     sender_id: str
@@ -13,3 +13,22 @@ class TranslationRequest(BaseModel):
     text: str
     source_lang: str
     target_lang: str
+
+
+class BatchTranslationRequest(BaseModel):
+    """
+    Many translations in one call: explicit `items`, and/or every text in `texts`
+    translated from `source_lang` into each of `target_langs`.
+    """
+    items: List[TranslationRequest] = []
+    texts: List[str] = []
+    source_lang: str = "eng_Latn"
+    target_langs: List[str] = []
+
+    def expand(self) -> List[TranslationRequest]:
+        """All requested translations in response order: items first, then texts x target_langs"""
+        expanded = list(self.items)
+        for text in self.texts:
+            for target_lang in self.target_langs:
+                expanded.append(TranslationRequest(text=text, source_lang=self.source_lang, target_lang=target_lang))
+        return expanded
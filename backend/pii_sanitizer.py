@@ -0,0 +1,155 @@
+import ipaddress
+import re
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+def luhn_valid(candidate: str) -> bool:
+    """Luhn checksum over the digits of candidate (separators are ignored)"""
+    digits = [int(c) for c in candidate if c.isdigit()]
+    if not 13 <= len(digits) <= 19:
+        return False
+    total = 0
+    for i, digit in enumerate(reversed(digits)):
+        if i % 2 == 1:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    return total % 10 == 0
+
+
+def ip_valid(candidate: str) -> bool:
+    if ":" not in candidate:
+        # The pattern already guarantees four dotted groups of 1-3 digits
+        return all(int(octet) <= 255 for octet in candidate.split("."))
+    # A single colon is a clock time or ratio, never an IPv6 address
+    if candidate.count(":") < 2:
+        return False
+    try:
+        ipaddress.IPv6Address(candidate)
+        return True
+    except ValueError:
+        return False
+
+
+_DATE = re.compile(r"\d{4}[-./]\d{1,2}[-./]\d{1,2}|\d{1,2}[-./]\d{1,2}[-./]\d{2,4}")
+
+
+# A decimal number ("3.14159265", "1234567.89") is never a phone number, even when it fits a layout
+_DECIMAL = re.compile(r"\+?\d+\.\d+")
+
+
+def phone_valid(candidate: str) -> bool:
+    """
+    E.164 length (7-15 digits), and not a date or decimal number that happens to fit
+    one of the phone layouts the pattern accepts.
+    """
+    digit_count = sum(c.isdigit() for c in candidate)
+    if not 7 <= digit_count <= 15:
+        return False
+    return not (_DECIMAL.fullmatch(candidate) or _DATE.fullmatch(candidate))
+
+
+# Free-form grouping is only accepted after a + country code or an area code in parentheses.
+# Otherwise the number needs a trunk prefix ("020 7946 0958", "030-1234-5678") or the 3-3-4
+# NANP layout ("555.123.4567"), so amounts, versions, postcodes and ISBNs are left alone.
+# The lookbehind keeps a match from starting inside a token ("v10.0.19041.1").
+PHONE_PATTERN = (
+    r"(?<![\w+.])(?:"
+    r"(?:\+\d{1,3}[ .-]?(?:\(\d{1,4}\)[ .-]?)?|\(\d{1,4}\)[ .-]?)\d{1,4}(?:[ .-]?\d{1,4}){1,5}"
+    r"|0\d{1,4}(?:[ .-]\d{2,4}){1,4}"
+    r"|\d{3}[ .-]\d{3}[ .-]\d{4}"
+    r")(?!\w)"
+)
+
+
+class Detector:
+    """
+    One kind of PII: a regex, the placeholder it is replaced with, and an optional validator.
+    Patterns are combined into one scanner, so they must only use non-capturing groups.
+    """
+
+    def __init__(self, name: str, pattern: str, placeholder: str, validator: Optional[Callable[[str], bool]] = None):
+        self.name = name
+        self.pattern = pattern
+        self.placeholder = placeholder
+        self.validator = validator
+        self.regex = re.compile(pattern)
+
+    def accepts(self, candidate: str) -> bool:
+        return self.validator is None or self.validator(candidate)
+
+
+# Order matters: at any position the first detector that matches wins,
+# so URLs are tried before emails and card numbers before phone numbers
+DEFAULT_DETECTORS = (
+    Detector("url", r"(?i:\b(?:https?://|www\.)[^\s<>\"']*[^\s<>\"'.,;:!?)\]])", "[URL]"),
+    Detector("email", r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b", "[EMAIL]"),
+    Detector("credit_card", r"\b\d(?:[ -]?\d){12,18}\b", "[CREDIT_CARD]", luhn_valid),
+    Detector(
+        "ip",
+        r"\b(?:\d{1,3}\.){3}\d{1,3}\b|(?i:\b[0-9a-f]{1,4}(?::{1,2}[0-9a-f]{1,4}){1,7}\b)",
+        "[IP]",
+        ip_valid
+    ),
+    Detector(
+        "phone",
+        PHONE_PATTERN,
+        "[PHONE]",
+        phone_valid
+    ),
+)
+
+
+class SanitizerEngine:
+    """
+    Replaces PII with placeholders in a single scan per message.
+
+    All detectors are compiled once into one alternation with a named group each;
+    re.sub walks the text once and the matching group tells which detector fired.
+    A candidate rejected by its validator (e.g. a failed Luhn check) is offered to the
+    later detectors before being left unchanged. Messages with no digit, "@" or URL
+    prefix can't contain any of the default PII kinds and skip the scan entirely.
+    """
+
+    def __init__(self, detectors: Sequence[Detector] = DEFAULT_DETECTORS, prefilter: Optional[str] = r"[0-9@]|(?i:://|www\.)"):
+        self.detectors: List[Detector] = list(detectors)
+        self._by_group = {f"d{i}": (i, detector) for i, detector in enumerate(self.detectors)}
+        self._scanner = re.compile("|".join(
+            f"(?P<d{i}>{detector.pattern})" for i, detector in enumerate(self.detectors)
+        ))
+        self._prefilter = re.compile(prefilter) if prefilter else None
+
+        self.messages_scanned = 0
+        self.messages_redacted = 0
+        self.counts: Dict[str, int] = {detector.name: 0 for detector in self.detectors}
+
+    def _replace(self, match: "re.Match") -> str:
+        candidate = match.group(0)
+        index, detector = self._by_group[match.lastgroup]
+        if detector.accepts(candidate):
+            self.counts[detector.name] += 1
+            return detector.placeholder
+        for fallback in self.detectors[index + 1:]:
+            if fallback.regex.fullmatch(candidate) and fallback.accepts(candidate):
+                self.counts[fallback.name] += 1
+                return fallback.placeholder
+        return candidate
+
+    def sanitize(self, text: str) -> str:
+        if not text:
+            return text
+        self.messages_scanned += 1
+        if self._prefilter is not None and self._prefilter.search(text) is None:
+            return text
+        sanitized = self._scanner.sub(self._replace, text)
+        if sanitized != text:
+            self.messages_redacted += 1
+        return sanitized
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "messages_scanned": self.messages_scanned,
+            "messages_redacted": self.messages_redacted,
+            "detections": dict(self.counts)
+        }
@@ -1,28 +1,72 @@
 import hashlib
+import hmac
+import os
 import time
-from typing import Dict, Optional
+from collections import OrderedDict
+from typing import Dict, Optional, Union
+from pii_sanitizer import SanitizerEngine
+from message_store import MessageStore, message_store
+from scalability_config import config
 
 class PrivacyService:
-    def __init__(self):
-        self.message_retention_hours = 24  # Auto-delete after 24h
-        self.stored_messages: Dict[str, dict] = {}
-    
+    def __init__(
+        self,
+        sanitizer: Optional[SanitizerEngine] = None,
+        secret: Optional[Union[str, bytes]] = None,
+        max_cached_ids: int = 10000,
+        stored_messages: Optional[MessageStore] = None
+    ):
+        # Chat history, expired an hour bucket at a time after message_retention_hours
+        self.stored_messages = stored_messages or message_store
+        self.message_retention_hours = self.stored_messages.retention_seconds / 3600
+        # PII detectors are compiled once and shared by every message
+        self.sanitizer = sanitizer or SanitizerEngine()
+
+        # Keyed so anonymized ids can't be reversed by hashing guessed user ids
+        self._secret = self._as_key(secret) if secret else os.urandom(32)
+        self.key_version = 1
+        # Bounded LRU of {user_id: anonymized id}
+        self._anonymized_ids: "OrderedDict[str, str]" = OrderedDict()
+        self.max_cached_ids = max_cached_ids
+
+    @staticmethod
+    def _as_key(secret: Union[str, bytes]) -> bytes:
+        return secret.encode() if isinstance(secret, str) else secret
+
     def anonymize_user_id(self, user_id: str) -> str:
-        """Hash user ID for privacy"""
-        return hashlib.sha256(user_id.encode()).hexdigest()[:16]
+        """HMAC-SHA256 of the user ID under the current secret, memoized"""
+        anonymized = self._anonymized_ids.get(user_id)
+        if anonymized is not None:
+            self._anonymized_ids.move_to_end(user_id)
+            return anonymized
+
+        anonymized = hmac.new(self._secret, user_id.encode(), hashlib.sha256).hexdigest()[:16]
+        self._anonymized_ids[user_id] = anonymized
+        if len(self._anonymized_ids) > self.max_cached_ids:
+            self._anonymized_ids.popitem(last=False)
+        return anonymized
+
+    def rotate_secret(self, new_secret: Optional[Union[str, bytes]] = None):
+        """
+        Switch to a new HMAC secret (random if not given). Ids computed afterwards no longer
+        match earlier ones; connections keep the id they were given at connect time.
+        """
+        self._secret = self._as_key(new_secret) if new_secret else os.urandom(32)
+        self.key_version += 1
+        self._anonymized_ids.clear()
     
     def should_retain_message(self, timestamp: float) -> bool:
         """Check if message should be retained based on privacy policy"""
         return (time.time() - timestamp) < (self.message_retention_hours * 3600)
     
     def sanitize_message(self, message: str) -> str:
-        """Remove potential PII from messages"""
-        # Basic PII removal - in production, use more sophisticated methods
-        import re
-        # Remove email patterns
-        message = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '[EMAIL]', message)
-        # Remove phone patterns
-        message = re.sub(r'\b\d{3}-\d{3}-\d{4}\b', '[PHONE]', message)
-        return message
-
-privacy_service = PrivacyService()
\ No newline at end of file
+        """Replace emails, phone numbers, card numbers, IPs and URLs with placeholders"""
+        return self.sanitizer.sanitize(message)
+
+    def get_stats(self) -> Dict[str, object]:
+        return self.sanitizer.get_stats()
+
+privacy_service = PrivacyService(
+    secret=config.anonymization_secret or None,
+    max_cached_ids=config.anonymized_id_cache_size
+)
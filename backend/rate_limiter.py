@@ -0,0 +1,171 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from scalability_config import config
+
+# Close code for a worker at its connection cap ("Try Again Later")
+WS_TRY_AGAIN_LATER = 1013
+
+
+class TokenBucket:
+    """Refills rate tokens per second up to capacity; each admitted message takes one"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = now
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self, now: float, cost: float = 1) -> bool:
+        self._refill(now)
+        if self.tokens < cost:
+            return False
+        self.tokens -= cost
+        return True
+
+    def retry_after(self, now: float, cost: float = 1) -> float:
+        """Seconds until cost tokens are available"""
+        self._refill(now)
+        return max(0.0, (cost - self.tokens) / self.rate)
+
+
+class RateLimiter:
+    """
+    Token buckets keyed by client or room. Buckets are kept in LRU order and the least
+    recently used is dropped past max_keys; by then it has normally been idle long
+    enough to refill, so forgetting it doesn't let the key exceed its rate.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.allowed = 0
+        self.rejected = 0
+
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def allow(self, key: str, now: Optional[float] = None) -> bool:
+        if not self.enabled():
+            return True
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        if bucket.try_acquire(now):
+            self.allowed += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def retry_after(self, key: str, now: Optional[float] = None) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return 0.0
+        return bucket.retry_after(time.monotonic() if now is None else now)
+
+    def get_stats(self) -> Dict[str, float]:
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "tracked_keys": len(self._buckets),
+            "allowed": self.allowed,
+            "rejected": self.rejected
+        }
+
+
+class AdmissionController:
+    """
+    Cheap checks at the edge, before a message is sanitized, stored or translated:
+    connection cap per worker, message size, then per-client and per-room rates.
+    """
+
+    def __init__(
+        self,
+        max_connections: int,
+        max_message_chars: int,
+        client_limiter: RateLimiter,
+        room_limiter: RateLimiter
+    ):
+        self.max_connections = max_connections
+        self.max_message_chars = max_message_chars
+        self.client_limiter = client_limiter
+        self.room_limiter = room_limiter
+        self.connections_rejected = 0
+        self.messages_too_large = 0
+        # Admitted connections still in their handshake, not yet counted as room members
+        self.reserved_connections = 0
+
+    def reserve_connection(self, active_connections: int) -> bool:
+        """
+        Take a slot for a new connection, or False when the worker is full. Call
+        release_connection once the connection has joined its room (or failed to).
+        Reserving before the handshake is awaited keeps concurrent handshakes under the cap.
+        """
+        if self.max_connections > 0 and active_connections + self.reserved_connections >= self.max_connections:
+            self.connections_rejected += 1
+            return False
+        self.reserved_connections += 1
+        return True
+
+    def release_connection(self):
+        self.reserved_connections -= 1
+
+    def check_message(self, client_id: str, room: str, content: str) -> Optional[Dict[str, object]]:
+        """None if the message may be processed, otherwise the status frame to send back to the sender"""
+        if self.max_message_chars > 0 and len(content) > self.max_message_chars:
+            self.messages_too_large += 1
+            return {
+                "type": "status",
+                "status": "message_too_large",
+                "code": 413,
+                "content": f"Message exceeds {self.max_message_chars} characters and was not sent",
+                "max_chars": self.max_message_chars
+            }
+        now = time.monotonic()
+        # Client first, so a throttled client doesn't use up its room's budget
+        for limiter, key, scope in (
+            (self.client_limiter, client_id, "client"),
+            (self.room_limiter, room, "room")
+        ):
+            if not limiter.allow(key, now):
+                return {
+                    "type": "status",
+                    "status": "rate_limited",
+                    "code": 429,
+                    "scope": scope,
+                    "content": "Sending too fast, message was not sent",
+                    "retry_after_ms": round(limiter.retry_after(key, now) * 1000)
+                }
+        return None
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "max_connections": self.max_connections,
+            "connections_rejected": self.connections_rejected,
+            "reserved_connections": self.reserved_connections,
+            "max_message_chars": self.max_message_chars,
+            "messages_too_large": self.messages_too_large,
+            "client": self.client_limiter.get_stats(),
+            "room": self.room_limiter.get_stats()
+        }
+
+
+admission_controller = AdmissionController(
+    max_connections=config.max_connections_per_worker,
+    max_message_chars=config.max_message_chars,
+    client_limiter=RateLimiter(config.client_messages_per_second, config.client_message_burst),
+    room_limiter=RateLimiter(config.room_messages_per_second, config.room_message_burst)
+)
@@ -0,0 +1,103 @@
+from fastapi import WebSocket
+from typing import Dict, List, Optional, Tuple
+from client_connection import ClientConnection
+
+DEFAULT_ROOM = "lobby"
+
+
+class Room:
+    """Members of one chat room, indexed by preferred language"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.members: Dict[str, ClientConnection] = {}
+        # {lang: {client_id: connection}}, kept in sync on join/leave
+        self.members_by_lang: Dict[str, Dict[str, ClientConnection]] = {}
+
+    def add(self, connection: ClientConnection) -> Optional[ClientConnection]:
+        """Add a member; a reconnect under the same id replaces (and returns) the old connection"""
+        client_id = connection.client_id
+        previous = self.members.get(client_id)
+        if previous is not None:
+            self._unindex(client_id, previous.lang)
+        self.members[client_id] = connection
+        self.members_by_lang.setdefault(connection.lang, {})[client_id] = connection
+        return previous
+
+    def remove(self, client_id: str, websocket: WebSocket) -> Optional[ClientConnection]:
+        connection = self.members.get(client_id)
+        # Only remove if the websocket matches (prevents race condition during reconnect)
+        if connection is None or connection.ws != websocket:
+            return None
+        del self.members[client_id]
+        self._unindex(client_id, connection.lang)
+        return connection
+
+    def _unindex(self, client_id: str, lang: str):
+        lang_members = self.members_by_lang.get(lang)
+        if lang_members is not None:
+            lang_members.pop(client_id, None)
+            if not lang_members:
+                del self.members_by_lang[lang]
+
+    def languages(self) -> List[str]:
+        return list(self.members_by_lang.keys())
+
+    def recipients_by_lang(self, exclude_client_id: Optional[str] = None) -> Dict[str, List[ClientConnection]]:
+        """Group members (minus the excluded sender) by language"""
+        groups = {}
+        for lang, lang_members in self.members_by_lang.items():
+            recipients = [
+                connection for client_id, connection in lang_members.items()
+                if client_id != exclude_client_id
+            ]
+            if recipients:
+                groups[lang] = recipients
+        return groups
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+
+class RoomRegistry:
+    """Rooms with at least one member connected to this worker"""
+
+    def __init__(self):
+        self.rooms: Dict[str, Room] = {}
+
+    def get(self, name: str) -> Optional[Room]:
+        return self.rooms.get(name)
+
+    def join(self, connection: ClientConnection) -> Tuple[bool, Optional[ClientConnection]]:
+        """
+        Add a member to connection.room.
+        Returns (True if this worker just started hosting the room, replaced connection or None).
+        """
+        room = self.rooms.get(connection.room)
+        created = room is None
+        if created:
+            room = self.rooms[connection.room] = Room(connection.room)
+        return created, room.add(connection)
+
+    def leave(self, name: str, client_id: str, websocket: WebSocket) -> Tuple[Optional[ClientConnection], bool]:
+        """Remove a member. Returns (removed connection or None, True if the room is now empty here)"""
+        room = self.rooms.get(name)
+        connection = room.remove(client_id, websocket) if room is not None else None
+        if connection is None:
+            return None, False
+        if not room.members:
+            del self.rooms[name]
+            return connection, True
+        return connection, False
+
+    def connections(self) -> List[ClientConnection]:
+        return [connection for room in self.rooms.values() for connection in room.members.values()]
+
+    def connection_count(self) -> int:
+        return sum(len(room) for room in self.rooms.values())
+
+    def get_stats(self) -> Dict[str, Dict]:
+        return {
+            name: {"members": len(room), "languages": room.languages()}
+            for name, room in self.rooms.items()
+        }
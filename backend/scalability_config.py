@@ -10,12 +10,83 @@ class ScalabilityConfig:
         self.redis_port = int(os.getenv("REDIS_PORT", "6379"))
         
         # Load balancing
+        # (connections past the cap are closed with 1013 Try Again Later; 0 = no cap)
         self.max_connections_per_worker = int(os.getenv("MAX_CONNECTIONS", "1000"))
         self.worker_count = int(os.getenv("WORKER_COUNT", "4"))
+
+        # Per-connection outbound queues ("drop_oldest" or "disconnect" when full)
+        self.outbound_queue_size = int(os.getenv("OUTBOUND_QUEUE_SIZE", "256"))
+        self.send_timeout_seconds = float(os.getenv("SEND_TIMEOUT_SECONDS", "5"))
+        self.slow_consumer_policy = os.getenv("SLOW_CONSUMER_POLICY", "drop_oldest")
+
+        # Admission control for incoming chat messages (0 disables each limit):
+        # token buckets per client and per room, and a cap on message length
+        self.client_messages_per_second = float(os.getenv("CLIENT_MESSAGES_PER_SECOND", "2"))
+        self.client_message_burst = float(os.getenv("CLIENT_MESSAGE_BURST", "10"))
+        self.room_messages_per_second = float(os.getenv("ROOM_MESSAGES_PER_SECOND", "20"))
+        self.room_message_burst = float(os.getenv("ROOM_MESSAGE_BURST", "50"))
+        self.max_message_chars = int(os.getenv("MAX_MESSAGE_CHARS", "4000"))
         
         # Performance thresholds
         self.max_latency_ms = int(os.getenv("MAX_LATENCY_MS", "500"))
         self.target_throughput_rps = int(os.getenv("TARGET_RPS", "100"))
+
+        # Inference worker pool
+        self.inference_workers = int(os.getenv("INFERENCE_WORKERS", "1"))
+        self.inference_queue_depth = int(os.getenv("INFERENCE_QUEUE_DEPTH", "32"))
+        # Model execution: "eager" (fp32) or "int8" (dynamic quantization, CPU only);
+        # torch thread pools, 0 = torch default
+        self.inference_backend = os.getenv("INFERENCE_BACKEND", "eager")
+        self.torch_intra_op_threads = int(os.getenv("TORCH_INTRA_OP_THREADS", "0"))
+        self.torch_inter_op_threads = int(os.getenv("TORCH_INTER_OP_THREADS", "0"))
+
+        # Token-by-token delivery for clients connecting with ?stream=true
+        self.streaming_enabled = os.getenv("STREAMING_ENABLED", "true").lower() == "true"
+        # Shorter messages finish quickly anyway and go through micro-batching even for streaming clients
+        self.stream_min_chars = int(os.getenv("STREAM_MIN_CHARS", "60"))
+
+        # Micro-batching of concurrent translations
+        self.batch_max_wait_ms = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+        self.batch_max_size = int(os.getenv("BATCH_MAX_SIZE", "16"))
+        self.batch_max_tokens = int(os.getenv("BATCH_MAX_TOKENS", "2048"))
+
+        # Messages at least this long (or with line breaks) are translated sentence by sentence
+        # in one batch and reassembled; 0 disables segmentation. Longer sentences are cut at clauses.
+        self.segment_min_chars = int(os.getenv("SEGMENT_MIN_CHARS", "120"))
+        self.segment_max_chars = int(os.getenv("SEGMENT_MAX_CHARS", "400"))
+
+        # In-process translation cache (TTL of 0 disables expiry)
+        self.cache_max_entries = int(os.getenv("TRANSLATION_CACHE_MAX_ENTRIES", "10000"))
+        self.cache_max_bytes = int(os.getenv("TRANSLATION_CACHE_MAX_MB", "16")) * 1024 * 1024
+        self.cache_ttl_seconds = float(os.getenv("TRANSLATION_CACHE_TTL_SECONDS", "0")) or None
+        # Cross-worker cache tier in Redis (only used when REDIS_ENABLED=true)
+        self.shared_cache_ttl_seconds = int(os.getenv("SHARED_CACHE_TTL_SECONDS", "86400")) or None
+
+        # Logging: default level, per-module overrides ("socket_manager=DEBUG,translation_service=WARNING"),
+        # fraction of per-message debug lines kept, and whether message text may appear in logs
+        self.log_level = os.getenv("LOG_LEVEL", "INFO").upper()
+        self.log_levels = os.getenv("LOG_LEVELS", "")
+        self.log_sample_rate = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
+        self.log_message_content = os.getenv("LOG_MESSAGE_CONTENT", "false").lower() == "true"
+
+        # HMAC key for anonymized client ids; share it across workers so ids match.
+        # When unset each process generates its own key at startup.
+        self.anonymization_secret = os.getenv("ANONYMIZATION_SECRET", "")
+        self.anonymized_id_cache_size = int(os.getenv("ANONYMIZED_ID_CACHE_SIZE", "10000"))
+
+        # Largest number of (text, target language) pairs accepted by POST /translate/batch
+        self.translate_batch_max_items = int(os.getenv("TRANSLATE_BATCH_MAX_ITEMS", "5000"))
+
+        # Load the model in the background at startup, then warm up these "source:target" pairs
+        self.model_preload = os.getenv("MODEL_PRELOAD", "true").lower() == "true"
+        self.model_warmup_pairs = os.getenv("MODEL_WARMUP_PAIRS", "eng_Latn:spa_Latn,eng_Latn:fra_Latn")
+
+        # Message history: hour-sharded retention, optional on-disk segments
+        # (HISTORY_SEGMENT_DIR unset keeps history in memory only)
+        self.message_retention_hours = float(os.getenv("MESSAGE_RETENTION_HOURS", "24"))
+        self.history_bucket_seconds = int(os.getenv("HISTORY_BUCKET_SECONDS", "3600"))
+        self.history_segment_dir = os.getenv("HISTORY_SEGMENT_DIR", "")
+        self.history_max_page = int(os.getenv("HISTORY_MAX_PAGE", "100"))
     
     def get_scaling_metrics(self) -> Dict[str, Any]:
         """Return current scaling configuration"""
@@ -23,8 +94,38 @@ class ScalabilityConfig:
             "redis_enabled": self.redis_enabled,
             "max_connections_per_worker": self.max_connections_per_worker,
             "worker_count": self.worker_count,
+            "outbound_queue_size": self.outbound_queue_size,
+            "send_timeout_seconds": self.send_timeout_seconds,
+            "slow_consumer_policy": self.slow_consumer_policy,
+            "client_messages_per_second": self.client_messages_per_second,
+            "client_message_burst": self.client_message_burst,
+            "room_messages_per_second": self.room_messages_per_second,
+            "room_message_burst": self.room_message_burst,
+            "max_message_chars": self.max_message_chars,
             "max_latency_ms": self.max_latency_ms,
-            "target_throughput_rps": self.target_throughput_rps
+            "target_throughput_rps": self.target_throughput_rps,
+            "inference_workers": self.inference_workers,
+            "inference_queue_depth": self.inference_queue_depth,
+            "inference_backend": self.inference_backend,
+            "torch_intra_op_threads": self.torch_intra_op_threads,
+            "torch_inter_op_threads": self.torch_inter_op_threads,
+            "streaming_enabled": self.streaming_enabled,
+            "stream_min_chars": self.stream_min_chars,
+            "batch_max_wait_ms": self.batch_max_wait_ms,
+            "batch_max_size": self.batch_max_size,
+            "batch_max_tokens": self.batch_max_tokens,
+            "segment_min_chars": self.segment_min_chars,
+            "segment_max_chars": self.segment_max_chars,
+            "cache_max_entries": self.cache_max_entries,
+            "cache_max_bytes": self.cache_max_bytes,
+            "cache_ttl_seconds": self.cache_ttl_seconds,
+            "shared_cache_ttl_seconds": self.shared_cache_ttl_seconds,
+            "log_level": self.log_level,
+            "log_sample_rate": self.log_sample_rate,
+            "model_preload": self.model_preload,
+            "message_retention_hours": self.message_retention_hours,
+            "history_bucket_seconds": self.history_bucket_seconds,
+            "history_persistent": bool(self.history_segment_dir)
         }
 
 config = ScalabilityConfig()
\ No newline at end of file
@@ -0,0 +1,142 @@
+import re
+from typing import Dict, List, Optional
+
+# Sentence boundaries, with the separator whitespace captured in a group:
+#   1. Latin/Cyrillic/Greek-style terminators, optional closing quotes/brackets, then whitespace
+#   2. CJK, Devanagari and Arabic terminators, which need no following space
+#   3. Line breaks (with any surrounding whitespace), always a boundary
+_BOUNDARY = re.compile(
+    r"[.!?…]+[\"'”’)\]]*(\s+)"
+    r"|[。！？｡।॥؟۔]+[\"'”’)\]」』]*(\s*)"
+    r"|(\s*\n\s*)"
+)
+
+# Clause breaks used to split an over-long sentence
+_CLAUSE_BREAK = re.compile(r"[,;:،、，；]\s+|[，、；]|\s+")
+
+# Words whose trailing period does not end a sentence
+ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e", "approx",
+    "no", "fig", "inc", "ltd", "co", "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep",
+    "sept", "oct", "nov", "dec"
+}
+
+
+def _is_abbreviation(text: str, period_index: int, next_index: int) -> bool:
+    if text[period_index] != ".":
+        return False
+    word_start = period_index
+    while word_start > 0 and not text[word_start - 1].isspace():
+        word_start -= 1
+    word = text[word_start:period_index].lower()
+    # Initials like "J. Smith" and known abbreviations
+    if (len(word) == 1 and word.isalpha()) or word in ABBREVIATIONS:
+        return True
+    # A lowercase continuation means the period was not a sentence end ("approx. five")
+    return next_index < len(text) and text[next_index].islower()
+
+
+class Segmentation:
+    """
+    A message split into translatable sentences and the exact whitespace between them,
+    so a translation can be reassembled with the original spacing and line breaks.
+    """
+
+    __slots__ = ("pieces", "is_sentence")
+
+    def __init__(self):
+        self.pieces: List[str] = []
+        self.is_sentence: List[bool] = []
+
+    def _add(self, piece: str, is_sentence: bool):
+        if not piece:
+            return
+        if is_sentence:
+            stripped = piece.strip()
+            lead = piece[:len(piece) - len(piece.lstrip())]
+            trail = piece[len(piece.rstrip()):]
+            self._add(lead, False)
+            if stripped:
+                self.pieces.append(stripped)
+                self.is_sentence.append(True)
+            self._add(trail, False)
+        elif self.pieces and not self.is_sentence[-1]:
+            self.pieces[-1] += piece
+        else:
+            self.pieces.append(piece)
+            self.is_sentence.append(False)
+
+    @property
+    def sentences(self) -> List[str]:
+        """Distinct sentences in first-seen order (repeats are translated once)"""
+        return list(dict.fromkeys(piece for piece, is_sentence in zip(self.pieces, self.is_sentence) if is_sentence))
+
+    def sentence_count(self) -> int:
+        return sum(self.is_sentence)
+
+    def reassemble(self, translations: Dict[str, str], spaced: bool = False) -> str:
+        """
+        Join translated sentences with the original separators. Sentences that had none
+        (CJK, Devanagari and Arabic terminators need no space) get one when spaced is set,
+        i.e. when the target language writes spaces between sentences.
+        """
+        parts = []
+        previous_is_sentence = False
+        for piece, is_sentence in zip(self.pieces, self.is_sentence):
+            if is_sentence and previous_is_sentence and spaced:
+                parts.append(" ")
+            parts.append(translations[piece] if is_sentence else piece)
+            previous_is_sentence = is_sentence
+        return "".join(parts)
+
+
+def _split_long(sentence: str, max_chars: int) -> List[str]:
+    """Cut a sentence longer than max_chars at clause breaks (or hard cuts), keeping every character"""
+    parts = []
+    while len(sentence) > max_chars:
+        cut = None
+        for match in _CLAUSE_BREAK.finditer(sentence, 0, max_chars):
+            if match.end() > 0:
+                cut = match.end()
+        if not cut:
+            cut = max_chars
+        parts.append(sentence[:cut])
+        sentence = sentence[cut:]
+    parts.append(sentence)
+    return parts
+
+
+def segment(text: str, max_sentence_chars: int = 512) -> Segmentation:
+    """Split text into sentences; any sentence over max_sentence_chars is cut at clause breaks"""
+    segmentation = Segmentation()
+    start = 0
+    for match in _BOUNDARY.finditer(text):
+        separator_start = next(match.start(g) for g in (1, 2, 3) if match.start(g) != -1)
+        # A line break always ends a sentence, even after an abbreviation or initial
+        if match.group(1) is not None and "\n" not in match.group(1) and _is_abbreviation(text, match.start(), match.end()):
+            continue
+        # Terminal punctuation stays with its sentence
+        for part in _split_long(text[start:separator_start], max_sentence_chars):
+            segmentation._add(part, True)
+        segmentation._add(text[separator_start:match.end()], False)
+        start = match.end()
+    for part in _split_long(text[start:], max_sentence_chars):
+        segmentation._add(part, True)
+    return segmentation
+
+
+class Segmenter:
+    """Decides which messages are worth splitting and splits them"""
+
+    def __init__(self, min_chars: int = 120, max_sentence_chars: int = 512):
+        self.min_chars = min_chars
+        self.max_sentence_chars = max_sentence_chars
+
+    def split(self, text: str) -> Optional[Segmentation]:
+        """A Segmentation with at least two sentences, or None to translate text whole"""
+        if len(text) < self.min_chars and "\n" not in text:
+            return None
+        segmentation = segment(text, self.max_sentence_chars)
+        if segmentation.sentence_count() < 2:
+            return None
+        return segmentation
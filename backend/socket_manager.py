@@ -1,151 +1,409 @@
 from fastapi import WebSocket
 from typing import List, Dict
 import json
-import redis.asyncio as redis
+import time
 import os
+import asyncio
+import uuid
+import itertools
+import logging
+from collections import OrderedDict
+from inference_executor import InferenceQueueFull, inference_executor
+from batch_scheduler import translation_scheduler
+from translation_cache import RedisCacheBackend, shared_translation_cache
+from scalability_config import config
+from message_broker import InMemoryBroker, RedisBroker
+from room_registry import DEFAULT_ROOM, RoomRegistry
+from client_connection import ClientConnection
+from frames import LOADING_MODEL_FRAME, MODEL_LOADED_FRAME, encode_frame
+from instrumentation import stage_metrics
+from privacy_service import privacy_service
+from message_store import message_store
+from model_registry import model_registry
+from logging_config import debug_sampled, log_sampled
+
+logger = logging.getLogger(__name__)
+
+ROOM_CHANNEL_PREFIX = "chat:"
+
+def room_channel(room: str) -> str:
+    """Broker channel carrying one room's traffic between workers"""
+    return f"{ROOM_CHANNEL_PREFIX}{room}"
 
 class ConnectionManager:
     def __init__(self):
-        # Store connection info: {client_id: {"ws": WebSocket, "lang": str}}
-        self.active_connections: Dict[str, Dict] = {}
+        # Rooms hosted on this worker; each stores {client_id: ClientConnection}
+        self.rooms = RoomRegistry()
         self.redis = None
-        self.pubsub = None
-        # Try to connect to Redis, but don't fail if it's not available
-        try:
-            self.redis = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
-            self.pubsub = self.redis.pubsub()
-        except Exception as e:
-            print(f"Redis not available: {e}")
+        if config.redis_enabled:
+            # Try to connect to Redis, but don't fail if it's not available
+            try:
+                # Imported here so single-worker deployments don't pay for it at startup
+                import redis.asyncio as redis
+                self.redis = redis.Redis(host=config.redis_host, port=config.redis_port, db=0, decode_responses=True)
+                # Share translations across workers through the same client
+                shared_translation_cache.set_backend(RedisCacheBackend(self.redis))
+            except Exception as e:
+                logger.warning("Redis not available: %s", e)
+
+        # Horizontal fan-out: every worker has a node id, publishes each message once
+        # and delivers messages received from the broker to its local clients only
+        self.node_id = uuid.uuid4().hex[:12]
+        self._message_seq = 0
+        self._seen_message_ids: "OrderedDict[str, None]" = OrderedDict()
+        self.max_seen_message_ids = 10000
+        self._delivery_tasks = set()
+        if config.redis_enabled and self.redis is not None:
+            self.broker = RedisBroker(self.redis)
+        else:
+            self.broker = InMemoryBroker()
 
-    async def connect(self, websocket: WebSocket, client_id: str, preferred_lang: str = "eng_Latn"):
+    async def connect(
+        self,
+        websocket: WebSocket,
+        client_id: str,
+        preferred_lang: str = "eng_Latn",
+        room: str = DEFAULT_ROOM,
+        streaming: bool = False
+    ) -> ClientConnection:
         await websocket.accept()
-        self.active_connections[client_id] = {
-            "ws": websocket,
-            "lang": preferred_lang
-        }
-        # Subscribe to this client's channel in Redis to receive messages from other workers
-        # We need a separate task for listening to Redis
-        # For simplicity in this MVP, we will just have a global broadcast channel
-        pass
-
-    def disconnect(self, client_id: str, websocket: WebSocket):
-        if client_id in self.active_connections:
-            # Only remove if the websocket matches (prevents race condition during reconnect)
-            if self.active_connections[client_id]["ws"] == websocket:
-                del self.active_connections[client_id]
-
-    async def broadcast(self, message_data: dict, exclude_client_id: str = None):
+        connection = ClientConnection(
+            websocket,
+            client_id,
+            preferred_lang,
+            room,
+            max_queue_size=config.outbound_queue_size,
+            send_timeout=config.send_timeout_seconds,
+            slow_consumer_policy=config.slow_consumer_policy,
+            on_evict=self._on_evict,
+            streaming=streaming and config.streaming_enabled,
+            anonymized_id=privacy_service.anonymize_user_id(client_id)
+        )
+        connection.start()
+        hosting_new_room, replaced = self.rooms.join(connection)
+        if replaced is not None:
+            replaced.close()
+        # Only receive other workers' traffic for rooms that have members here
+        if hosting_new_room:
+            try:
+                await self.broker.subscribe(room_channel(room))
+            except Exception as e:
+                logger.warning("Broker subscribe failed for room %s: %s", room, e)
+        return connection
+
+    async def disconnect(self, client_id: str, websocket: WebSocket, room: str = DEFAULT_ROOM):
+        connection, room_emptied = self.rooms.leave(room, client_id, websocket)
+        if connection is not None:
+            connection.close()
+        if room_emptied:
+            try:
+                await self.broker.unsubscribe(room_channel(room))
+            except Exception as e:
+                logger.warning("Broker unsubscribe failed for room %s: %s", room, e)
+
+    def _on_evict(self, connection: ClientConnection):
+        # Stop routing to an evicted client right away; its receive loop finishes the cleanup
+        task = asyncio.ensure_future(self.disconnect(connection.client_id, connection.ws, room=connection.room))
+        self._delivery_tasks.add(task)
+        task.add_done_callback(self._delivery_tasks.discard)
+
+    def connection_count(self) -> int:
+        return self.rooms.connection_count()
+
+    def get_connection_stats(self) -> List[Dict]:
+        """Outbound queue depth and drop counts for every local connection"""
+        return [connection.get_stats() for connection in self.rooms.connections()]
+
+    def new_message_id(self) -> str:
+        """Message ids are unique across workers so remote copies can be deduplicated"""
+        self._message_seq += 1
+        return f"{self.node_id}-{self._message_seq}"
+
+    def _mark_seen(self, message_id: str) -> bool:
+        """Record message_id, returning False if it was already delivered here"""
+        if message_id in self._seen_message_ids:
+            return False
+        self._seen_message_ids[message_id] = None
+        if len(self._seen_message_ids) > self.max_seen_message_ids:
+            self._seen_message_ids.popitem(last=False)
+        return True
+
+    async def broadcast(self, message_data: dict, exclude_client_id: str = None, room: str = DEFAULT_ROOM):
         """
-        Broadcasts a message to all connected clients, translating it to their preferred language.
+        Broadcasts a message to every member of room on every worker.
+        The message is published once for other workers and delivered locally here.
         message_data: {"content": str, "sender": str, "original_lang": str}
         """
+        if not message_data.get("id"):
+            message_data["id"] = self.new_message_id()
+        # Set once by the origin worker so every worker files the message under the same time
+        message_data.setdefault("timestamp", time.time())
+        self._mark_seen(message_data["id"])
 
-        from main import get_translation_service_async, is_model_loaded # Avoid circular import
-        
-        # Check if model is loaded, if not, notify everyone (or just the relevant people)
+        # 1. Publish first so other workers translate in parallel with us
+        envelope = {
+            "origin": self.node_id,
+            "room": room,
+            "exclude_client_id": exclude_client_id,
+            "data": message_data
+        }
+        try:
+            await self.broker.publish(room_channel(room), encode_frame(envelope))
+        except Exception as e:
+            logger.warning("Broker publish failed: %s", e)
+
+        # 2. Send to local connections
+        await self.deliver_local(room, message_data, exclude_client_id)
+
+    async def deliver_local(self, room_name: str, message_data: dict, exclude_client_id: str = None):
+        """
+        Delivers a message to the room's members on this worker, translating it to their preferred language.
+        Never republishes, so messages received from other workers can't echo back.
+        """
+        # Join/leave notices are not part of the room's history
+        if message_data.get("sender") != "System":
+            message_store.add(room_name, message_data)
+
+        room = self.rooms.get(room_name)
+        if room is None:
+            return
+
+        # Only messages sent before the startup preload finishes have to wait for the model
         model_was_loading = False
-        if not is_model_loaded():
+        if not model_registry.is_loaded():
             model_was_loading = True
-            print("Model not loaded. Notifying clients...")
-            loading_msg = {
-                "type": "status",
-                "status": "loading_model",
-                "content": "Initializing translation model (this may take a few seconds)..."
-            }
-            # Broadcast loading status to all connected clients
-            for connection_info in self.active_connections.values():
-                try:
-                    await connection_info["ws"].send_text(json.dumps(loading_msg))
-                except:
-                    pass
-
-        ts = await get_translation_service_async()
+            logger.info("Model not loaded. Notifying clients...")
+            self._send_to_group(list(room.members.values()), LOADING_MODEL_FRAME)
+
+        await model_registry.get_async()
 
         if model_was_loading:
-            loaded_msg = {
-                "type": "status",
-                "status": "loaded",
-                "content": "Model Loaded"
-            }
-            for connection_info in self.active_connections.values():
-                try:
-                    await connection_info["ws"].send_text(json.dumps(loaded_msg))
-                except:
-                    pass
+            self._send_to_group(list(room.members.values()), MODEL_LOADED_FRAME)
         
-        # 1. Send to local connections
-        print(f"Broadcasting message to {len(self.active_connections)} clients. Exclude: {exclude_client_id}")
-        for client_id, connection_info in self.active_connections.items():
-            # Skip the sender to avoid echo (frontend handles optimistic updates)
-            if client_id == exclude_client_id:
-                print(f"Skipping sender {client_id}")
-                continue
-                
-            try:
-                target_lang = connection_info["lang"]
-                source_text = message_data.get("content", "")
-                source_lang = message_data.get("original_lang", "eng_Latn")
-                sender_id = message_data.get("sender", "unknown")
-                
-                print(f"Processing for {client_id} (Lang: {target_lang})")
-                
-                # Don't translate if languages match
-                if source_lang == target_lang:
-                    translated_text = source_text
-                    latency_ms = 0
+        # Group recipients by preferred language so each (source, target) pair is
+        # translated once per message, no matter how many clients share that language.
+        # Skip the sender to avoid echo (frontend handles optimistic updates)
+        debug_sampled(logger, "Broadcasting message to %d clients in %s", len(room), room_name)
+        recipients_by_lang = room.recipients_by_lang(exclude_client_id)
+
+        # One shared-cache round trip covers every target language of this message
+        await translation_scheduler.prefetch(
+            message_data.get("content", ""),
+            message_data.get("original_lang", "eng_Latn"),
+            recipients_by_lang.keys()
+        )
+
+        # The "translating" status only depends on the sender, so it is encoded once per message
+        translating_frame = encode_frame({
+            "type": "status",
+            "status": "translating",
+            "content": "Translating message...",
+            "sender": message_data.get("sender", "unknown")
+        })
+
+        # Language groups are translated concurrently so the scheduler can batch them
+        # together, and each group is delivered as soon as its own translation is ready
+        await asyncio.gather(*(
+            self._deliver_to_language_group(message_data, target_lang, recipients, translating_frame)
+            for target_lang, recipients in recipients_by_lang.items()
+        ))
+
+    def _send_to_group(self, recipients: List[ClientConnection], frame: str):
+        """Queue one pre-encoded frame on every recipient's writer; never waits on a socket"""
+        for connection in recipients:
+            connection.enqueue(frame)
+
+    async def _deliver_to_language_group(
+        self,
+        message_data: dict,
+        target_lang: str,
+        recipients: List[ClientConnection],
+        translating_frame: str
+    ):
+        """Translate message_data once into target_lang and send the same encoded frame to every recipient in the group"""
+        source_text = message_data.get("content", "")
+        source_lang = message_data.get("original_lang", "eng_Latn")
+        sender_id = message_data.get("sender", "unknown")
+
+        debug_sampled(logger, "Processing for %d clients (Lang: %s)", len(recipients), target_lang)
+
+        try:
+            # Don't translate if languages match
+            if source_lang == target_lang:
+                translated_text = source_text
+                latency_ms = 0
+            else:
+                # Notify clients that translation is in progress
+                self._send_to_group(recipients, translating_frame)
+
+                start_time = time.time()
+                # Only stream where time to first token matters: short messages are batched, and
+                # long multi-sentence messages finish sooner as one segmented batch than streamed
+                streaming_recipients = [
+                    connection for connection in recipients if connection.streaming
+                ] if self._should_stream(source_text) else []
+                cached = translation_scheduler.lookup(source_text, source_lang, target_lang) if streaming_recipients else None
+                if cached is not None:
+                    translated_text = cached
+                elif streaming_recipients:
+                    # Stream the group's translation as it is generated (bypasses batching)
+                    translated_text = await self._stream_translation(message_data, target_lang, streaming_recipients)
                 else:
-                    # Notify client that translation is in progress
-                    status_msg = {
-                        "type": "status",
-                        "status": "translating",
-                        "content": "Translating message...",
-                        "sender": sender_id
-                    }
-                    await connection_info["ws"].send_text(json.dumps(status_msg))
-
-                    # Translate
-                    import time
-                    start_time = time.time()
-                    translated_text = ts.translate(source_text, source_lang, target_lang)
-                    latency_ms = (time.time() - start_time) * 1000
-                
-                response = {
-                    "original": source_text,
-                    "translated": translated_text,
-                    "sender": sender_id,
-                    "target_lang": target_lang,
-                    "latency_ms": latency_ms,
-                    "id": message_data.get("id")
-                }
-                
-                await connection_info["ws"].send_text(json.dumps(response))
-                print(f"Sent to {client_id}")
-            except Exception as e:
-                print(f"Error sending to {client_id}: {e}")
-                # Handle disconnects might be done here or let the loop continue
-        
-        # 2. Publish to Redis for other workers (Scalability)
-        if self.redis:
+                    # Translate once for the whole language group via the batching scheduler
+                    translated_text = await translation_scheduler.translate(source_text, source_lang, target_lang)
+                latency_ms = (time.time() - start_time) * 1000
+                if not translated_text.startswith("[Translation Error]"):
+                    # Kept with the stored message so history replays don't translate it again
+                    message_store.add_translation(message_data.get("id"), target_lang, translated_text)
+        except InferenceQueueFull as e:
+            # Backpressure: tell the group we are overloaded and deliver the original text
+            # Sampled: under overload this would otherwise fire for every message
+            log_sampled(logger, logging.WARNING, "Inference queue full, skipping translation to %s: %s", target_lang, e)
+            self._send_to_group(recipients, encode_frame({
+                "type": "status",
+                "status": "overloaded",
+                "code": 429,
+                "content": "Translation service is busy, showing original message",
+                "sender": sender_id
+            }))
+            translated_text = source_text
+            latency_ms = 0
+        except Exception as e:
+            logger.error("Error translating to %s: %s", target_lang, e)
+            return
+
+        response = {
+            "original": source_text,
+            "translated": translated_text,
+            "sender": sender_id,
+            "target_lang": target_lang,
+            "latency_ms": latency_ms,
+            "id": message_data.get("id")
+        }
+        with stage_metrics.span("serialize", source_lang, target_lang):
+            frame = encode_frame(response)
+        self._send_to_group(recipients, frame)
+
+    def _should_stream(self, text: str) -> bool:
+        return len(text) >= config.stream_min_chars and translation_scheduler.split(text) is None
+
+    async def _stream_translation(self, message_data: dict, target_lang: str, recipients: List[ClientConnection]) -> str:
+        """
+        Translate message_data into target_lang, pushing translation_delta frames to recipients
+        as tokens are generated. The regular message frame (same id) follows as the final frame.
+        """
+        source_text = message_data.get("content", "")
+        source_lang = message_data.get("original_lang", "eng_Latn")
+        message_id = message_data.get("id")
+        ts = await model_registry.get_async()
+
+        loop = asyncio.get_running_loop()
+        seq = itertools.count()
+
+        def send_delta(delta: str):
+            self._send_to_group(recipients, encode_frame({
+                "type": "translation_delta",
+                "id": message_id,
+                "sender": message_data.get("sender", "unknown"),
+                "target_lang": target_lang,
+                "seq": next(seq),
+                "delta": delta
+            }))
+
+        translated_text = await inference_executor.run(
+            ts.translate_stream,
+            source_text,
+            source_lang,
+            target_lang,
+            # Called on the inference thread; hop back to the event loop to enqueue frames
+            lambda delta: loop.call_soon_threadsafe(send_delta, delta)
+        )
+        translation_scheduler.remember(source_lang, target_lang, {source_text: translated_text})
+        return translated_text
+
+    async def get_translated_history(self, room: str, lang: str, limit: int = 50, before: float = None) -> Dict:
+        """
+        A page of room history as message frames translated into lang.
+        Translations stored when the messages were delivered are reused; the rest are
+        translated together, one batch per source language.
+        """
+        page = message_store.get_history(room, limit=limit, before=before)
+        translated: Dict[str, str] = {}
+        missing_by_lang: Dict[str, List[dict]] = {}
+        for message in page["messages"]:
+            if message["original_lang"] == lang:
+                translated[message["id"]] = message["content"]
+            elif lang in message["translations"]:
+                translated[message["id"]] = message["translations"][lang]
+            else:
+                missing_by_lang.setdefault(message["original_lang"], []).append(message)
+
+        overloaded = False
+        for source_lang, messages in missing_by_lang.items():
             try:
-                # We publish the original message, workers will translate locally
-                await self.redis.publish("chat_broadcast", json.dumps(message_data))
-            except Exception as e:
-                print(f"Redis publish failed: {e}")
+                texts = await translation_scheduler.translate_many(
+                    [message["content"] for message in messages], source_lang, lang
+                )
+                translated_group = True
+            except InferenceQueueFull:
+                # Fall back to the original text rather than queueing behind live traffic
+                overloaded = True
+                translated_group = False
+                texts = [message["content"] for message in messages]
+            for message, text in zip(messages, texts):
+                translated[message["id"]] = text
+                # Only this group's outcome decides what is saved; overloaded is reported for the whole page
+                if translated_group and not text.startswith("[Translation Error]"):
+                    message["translations"][lang] = text
+
+        return {
+            "messages": [
+                {
+                    "original": message["content"],
+                    "translated": translated[message["id"]],
+                    "sender": message["sender"],
+                    "target_lang": lang,
+                    "id": message["id"],
+                    "timestamp": message["timestamp"]
+                }
+                for message in page["messages"]
+            ],
+            "next_before": page["next_before"],
+            "overloaded": overloaded
+        }
 
-    async def redis_listener(self):
+    async def broker_listener(self):
         """
-        Background task to listen for Redis messages and broadcast them locally.
-        Should be started on app startup.
+        Background task delivering messages published by other workers to local clients.
+        Subscriptions follow the rooms hosted here (see connect/disconnect).
+        Started on app startup.
         """
-        if not self.redis:
+        while True:
+            try:
+                async for channel, payload in self.broker.listen():
+                    self._handle_remote_message(payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Broker listener error: %s", e)
+                await asyncio.sleep(1)
+
+    def _handle_remote_message(self, payload: str):
+        try:
+            envelope = json.loads(payload)
+            message_data = envelope["data"]
+            room = envelope["room"]
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            logger.warning("Dropping malformed broker message: %s", e)
             return
-        
-        pubsub = self.redis.pubsub()
-        await pubsub.subscribe("chat_broadcast")
-        async for message in pubsub.listen():
-            if message["type"] == "message":
-                data = json.loads(message["data"])
-                # Broadcast locally (this will trigger translation for local clients)
-                await self.broadcast(data)
+
+        # Skip our own publications and anything already delivered here
+        if envelope.get("origin") == self.node_id or not self._mark_seen(message_data.get("id", "")):
+            return
+
+        # Deliver concurrently so one slow translation doesn't hold up the listener
+        task = asyncio.ensure_future(self.deliver_local(room, message_data, envelope.get("exclude_client_id")))
+        self._delivery_tasks.add(task)
+        task.add_done_callback(self._delivery_tasks.discard)
 
 manager = ConnectionManager()
@@ -0,0 +1,95 @@
+import asyncio
+import json
+import pytest
+from typing import List
+from message_broker import InMemoryBroker, InMemoryHub
+from model_registry import model_registry
+from socket_manager import ConnectionManager, room_channel
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.frames: List[dict] = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, frame: str):
+        self.frames.append(json.loads(frame))
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        pass
+
+    def messages(self, message_id: str) -> List[dict]:
+        """Final chat frames for one message (status and delta frames carry no original text)"""
+        return [frame for frame in self.frames if frame.get("id") == message_id and "original" in frame]
+
+
+class StubTranslator:
+    model_name = "stub"
+
+    def translate_batch(self, texts, source_lang, target_lang):
+        return [f"[{target_lang}] {text}" for text in texts]
+
+
+@pytest.fixture
+def stub_model(monkeypatch):
+    # monkeypatch restores the shared registry afterwards, so no other test sees the stub
+    for attr in ("service", "state", "error", "load_seconds", "_load_task", "_loaded"):
+        monkeypatch.setattr(model_registry, attr, getattr(model_registry, attr))
+    monkeypatch.setattr(model_registry, "factory", StubTranslator)
+    model_registry.get()
+
+
+async def _settle():
+    # Let broker listeners, delivery tasks and connection writers run
+    for _ in range(20):
+        await asyncio.sleep(0.01)
+
+
+def test_two_workers_deliver_once_without_echo(stub_model):
+    async def scenario():
+        hub = InMemoryHub()
+        workers = [ConnectionManager(), ConnectionManager()]
+        for worker in workers:
+            worker.broker = InMemoryBroker(hub)
+        listeners = [asyncio.create_task(worker.broker_listener()) for worker in workers]
+        worker_a, worker_b = workers
+
+        sender, local_peer, remote_peer, other_room = FakeWebSocket(), FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        await worker_a.connect(sender, "sender", "eng_Latn", room="lobby")
+        await worker_a.connect(local_peer, "local", "eng_Latn", room="lobby")
+        await worker_b.connect(remote_peer, "remote", "spa_Latn", room="lobby")
+        await worker_b.connect(other_room, "elsewhere", "eng_Latn", room="other")
+
+        message = {"content": "hello everyone", "sender": "anon", "original_lang": "eng_Latn"}
+        await worker_a.broadcast(message, exclude_client_id="sender", room="lobby")
+        await _settle()
+
+        message_id = message["id"]
+        assert sender.messages(message_id) == []
+        # Exactly once: worker A skips its own publication when it comes back from the hub
+        assert [frame["translated"] for frame in local_peer.messages(message_id)] == ["hello everyone"]
+        # Worker B delivers it once, translated for its own client, and never publishes it back
+        assert [frame["translated"] for frame in remote_peer.messages(message_id)] == ["[spa_Latn] hello everyone"]
+        assert other_room.messages(message_id) == []
+
+        for listener in listeners:
+            listener.cancel()
+        await asyncio.gather(*listeners, return_exceptions=True)
+
+    asyncio.run(scenario())
+
+
+def test_unsubscribed_worker_gets_nothing():
+    async def scenario():
+        hub = InMemoryHub()
+        subscribed, idle = InMemoryBroker(hub), InMemoryBroker(hub)
+        channel = room_channel("lobby")
+        await subscribed.subscribe(channel)
+        await idle.subscribe(channel)
+        await idle.unsubscribe(channel)
+        assert hub.publish(channel, "payload") == 1
+        assert subscribed.queue.qsize() == 1 and idle.queue.qsize() == 0
+
+    asyncio.run(scenario())
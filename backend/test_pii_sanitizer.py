@@ -0,0 +1,62 @@
+import pytest
+from pii_sanitizer import SanitizerEngine, luhn_valid
+
+
+@pytest.fixture
+def engine():
+    return SanitizerEngine()
+
+
+def test_luhn():
+    assert luhn_valid("4111 1111 1111 1111")
+    assert luhn_valid("5500-0000-0000-0004")
+    assert not luhn_valid("4111 1111 1111 1112")
+    # Too short to be a card number even though the checksum passes
+    assert not luhn_valid("18")
+
+
+def test_card_numbers(engine):
+    assert engine.sanitize("My card is 4111 1111 1111 1111") == "My card is [CREDIT_CARD]"
+    assert engine.sanitize("Ref 4111 1111 1111 1112") == "Ref 4111 1111 1111 1112"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("The server is at 192.168.1.10", "The server is at [IP]"),
+    ("Not an address: 999.168.1.10", "Not an address: 999.168.1.10"),
+    ("Use 2001:db8::ff00:42:8329 for v6", "Use [IP] for v6"),
+    ("Loopback is ::1 or fe80::1", "Loopback is ::1 or [IP]"),
+    ("Meet at 10:30 tomorrow", "Meet at 10:30 tomorrow"),
+    ("Race finished in 12:30:45", "Race finished in 12:30:45"),
+])
+def test_ip_addresses_and_times(engine, text, expected):
+    assert engine.sanitize(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Call me on +44 20 7946 0958", "Call me on [PHONE]"),
+    ("Office: (555) 123-4567", "Office: [PHONE]"),
+    ("Dial 555-123-4567 2 times", "Dial [PHONE] 2 times"),
+    ("Cell 555 123 4567 or 555.123.4567", "Cell [PHONE] or [PHONE]"),
+    ("Home 020 7946 0958", "Home [PHONE]"),
+])
+def test_phone_numbers(engine, text, expected):
+    assert engine.sanitize(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "total 1234567.89 EUR",
+    "pi is 3.14159265",
+    "lat 48.858370",
+    "1000.5 1000.5",
+    "zip 90210-1234",
+    "ISBN 978-3-16-148410-0",
+    "release v10.0.19041.1",
+    "The price is 1 000 000 dollars",
+    "Population grew to 2.500.000 last year",
+    "We met in 1999 2000 2001 and 2002",
+    "Order 12345678 shipped on 2024-03-15",
+    "Due 01-02-2024",
+    "Scores were 120 340 560 780 this season",
+])
+def test_numbers_that_are_not_pii(engine, text):
+    assert engine.sanitize(text) == text
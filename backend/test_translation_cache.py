@@ -0,0 +1,40 @@
+import asyncio
+from translation_cache import InMemoryCacheBackend, SharedTranslationCache
+
+
+async def _drain_writes(cache: SharedTranslationCache):
+    # store_many writes in the background
+    await asyncio.gather(*cache._write_tasks)
+
+
+def test_shared_cache_hit_across_workers():
+    async def scenario():
+        backend = InMemoryCacheBackend()
+        worker_a = SharedTranslationCache(backend)
+        worker_b = SharedTranslationCache(backend)
+        long_text = "A longer message that is compressed before it is written to the shared tier. " * 2
+
+        worker_a.store_many("eng_Latn", "spa_Latn", {"Hello there": "Hola", long_text: long_text.upper()})
+        worker_a.store_many("eng_Latn", "fra_Latn", {"Hello there": "Bonjour"})
+        await _drain_writes(worker_a)
+
+        found = await worker_b.get_many("Hello  there", "eng_Latn", ["spa_Latn", "fra_Latn", "deu_Latn"])
+        assert found == {"spa_Latn": "Hola", "fra_Latn": "Bonjour"}
+        assert await worker_b.get_many(long_text, "eng_Latn", ["spa_Latn"]) == {"spa_Latn": long_text.upper()}
+        assert worker_b.hits == 3 and worker_b.misses == 1
+
+    asyncio.run(scenario())
+
+
+def test_shared_cache_respects_ttl():
+    async def scenario():
+        backend = InMemoryCacheBackend()
+        worker_a = SharedTranslationCache(backend, ttl_seconds=0.05)
+        worker_b = SharedTranslationCache(backend)
+        worker_a.store_many("eng_Latn", "spa_Latn", {"Hello": "Hola"})
+        await _drain_writes(worker_a)
+        await asyncio.sleep(0.1)
+        assert await worker_b.get_many("Hello", "eng_Latn", ["spa_Latn"]) == {}
+
+    asyncio.run(scenario())
+
@@ -0,0 +1,267 @@
+import asyncio
+import base64
+import hashlib
+import logging
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from scalability_config import config
+
+logger = logging.getLogger(__name__)
+
+# Rough per-entry bookkeeping cost (tuple, OrderedDict node, floats) on top of the strings
+ENTRY_OVERHEAD_BYTES = 200
+
+
+class TranslationCache:
+    """
+    In-process LRU cache of translations keyed by (normalized text, source, target).
+    Bounded both by entry count and by approximate memory, with an optional TTL.
+    Only used from the event loop thread, so it needs no locking.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 16 * 1024 * 1024, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # key -> (translation, expires_at, size_bytes)
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[str, Optional[float], int]]" = OrderedDict()
+        self.current_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapse whitespace and case so trivially different messages share an entry"""
+        return " ".join(text.split()).casefold()
+
+    def make_key(self, text: str, source_lang: str, target_lang: str) -> Tuple[str, str, str]:
+        return (self.normalize(text), source_lang, target_lang)
+
+    def get(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        key = self.make_key(text, source_lang, target_lang)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        translation, expires_at, _ = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return translation
+
+    def set(self, text: str, source_lang: str, target_lang: str, translation: str):
+        key = self.make_key(text, source_lang, target_lang)
+        size = len(key[0].encode()) + len(translation.encode()) + ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        self._entries[key] = (translation, expires_at, size)
+        self.current_bytes += size
+
+        while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def _remove(self, key: Tuple[str, str, str]):
+        _, _, size = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def __contains__(self, key: Tuple[str, str, str]) -> bool:
+        """Presence check by make_key() key that doesn't touch LRU order or counters"""
+        entry = self._entries.get(key)
+        return entry is not None and (entry[1] is None or entry[1] > time.monotonic())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0
+        }
+
+
+class InMemoryCacheBackend:
+    """Stand-in for Redis with the same async interface, for tests and single-process runs"""
+
+    def __init__(self):
+        self._values: Dict[str, Tuple[str, Optional[float]]] = {}
+
+    async def mget(self, keys: List[str]) -> List[Optional[str]]:
+        now = time.monotonic()
+        values = []
+        for key in keys:
+            entry = self._values.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= now:
+                del self._values[key]
+                entry = None
+            values.append(entry[0] if entry else None)
+        return values
+
+    async def set_many(self, mapping: Dict[str, str], ttl_seconds: Optional[int] = None):
+        expires_at = time.monotonic() + ttl_seconds if ttl_seconds else None
+        for key, value in mapping.items():
+            self._values[key] = (value, expires_at)
+
+
+class RedisCacheBackend:
+    """Shared cache backend on a redis.asyncio client (decode_responses=True)"""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def mget(self, keys: List[str]) -> List[Optional[str]]:
+        return await self.client.mget(keys)
+
+    async def set_many(self, mapping: Dict[str, str], ttl_seconds: Optional[int] = None):
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key, value in mapping.items():
+                pipe.set(key, value, ex=ttl_seconds)
+            await pipe.execute()
+
+
+class SharedTranslationCache:
+    """
+    Second cache tier shared by every worker process.
+    Lookups for all target languages of a message are a single MGET, writes are
+    fire-and-forget, and larger values are zlib-compressed. Backend errors are
+    treated as misses and pause the tier briefly so a dead Redis doesn't add
+    latency to every message.
+    """
+
+    KEY_PREFIX = "tr:v1:"
+    COMPRESS_MIN_BYTES = 64
+    FAILURE_BACKOFF_SECONDS = 30
+
+    def __init__(self, backend=None, ttl_seconds: Optional[int] = 86400):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self._disabled_until = 0.0
+        self._write_tasks = set()
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+
+    def set_backend(self, backend):
+        self.backend = backend
+
+    def is_available(self) -> bool:
+        return self.backend is not None and time.monotonic() >= self._disabled_until
+
+    def make_key(self, text: str, source_lang: str, target_lang: str) -> str:
+        digest = hashlib.sha1(TranslationCache.normalize(text).encode()).hexdigest()
+        return f"{self.KEY_PREFIX}{source_lang}:{target_lang}:{digest}"
+
+    @classmethod
+    def encode_value(cls, translation: str) -> str:
+        raw = translation.encode()
+        if len(raw) < cls.COMPRESS_MIN_BYTES:
+            return "r:" + translation
+        return "z:" + base64.b64encode(zlib.compress(raw)).decode("ascii")
+
+    @staticmethod
+    def decode_value(value: str) -> str:
+        if value.startswith("z:"):
+            return zlib.decompress(base64.b64decode(value[2:])).decode()
+        return value[2:]
+
+    def _record_failure(self, e: Exception):
+        self.errors += 1
+        self._disabled_until = time.monotonic() + self.FAILURE_BACKOFF_SECONDS
+        logger.warning("Shared translation cache unavailable: %s", e)
+
+    async def get_many(self, text: str, source_lang: str, target_langs: Iterable[str]) -> Dict[str, str]:
+        """Look up text in several target languages with one round trip"""
+        target_langs = list(target_langs)
+        if not target_langs or not self.is_available():
+            return {}
+
+        keys = [self.make_key(text, source_lang, target_lang) for target_lang in target_langs]
+        try:
+            values = await self.backend.mget(keys)
+        except Exception as e:
+            self._record_failure(e)
+            return {}
+
+        found = {}
+        for target_lang, value in zip(target_langs, values):
+            if value is None:
+                self.misses += 1
+                continue
+            try:
+                found[target_lang] = self.decode_value(value)
+                self.hits += 1
+            except Exception:
+                self.misses += 1
+        return found
+
+    def store_many(self, source_lang: str, target_lang: str, translations: Dict[str, str]):
+        """Write translations back in the background; callers never wait on Redis"""
+        if not translations or not self.is_available():
+            return
+        mapping = {
+            self.make_key(text, source_lang, target_lang): self.encode_value(translation)
+            for text, translation in translations.items()
+        }
+        task = asyncio.ensure_future(self._write(mapping))
+        self._write_tasks.add(task)
+        task.add_done_callback(self._write_tasks.discard)
+
+    async def _write(self, mapping: Dict[str, str]):
+        try:
+            await self.backend.set_many(mapping, self.ttl_seconds)
+            self.writes += len(mapping)
+        except Exception as e:
+            self._record_failure(e)
+
+    def get_stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.backend is not None,
+            "available": self.is_available(),
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "errors": self.errors,
+            "hit_rate": self.hits / lookups if lookups else 0
+        }
+
+
+translation_cache = TranslationCache(
+    max_entries=config.cache_max_entries,
+    max_bytes=config.cache_max_bytes,
+    ttl_seconds=config.cache_ttl_seconds
+)
+
+shared_translation_cache = SharedTranslationCache(ttl_seconds=config.shared_cache_ttl_seconds)
@@ -1,17 +1,65 @@
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, pipeline
+from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, GenerationConfig
+from transformers.generation.streamers import BaseStreamer
 import torch
-from functools import lru_cache
+import copy
+import threading
+import logging
+from typing import Callable, Dict, List, Optional
+from instrumentation import stage_metrics
+from inference_backends import configure_torch_threads, get_backend
+from scalability_config import config
+from logging_config import debug_sampled, redact
+
+logger = logging.getLogger(__name__)
+
+class DeltaStreamer(BaseStreamer):
+    """
+    Generation streamer that decodes the tokens produced so far after every step
+    and reports only the newly added text to on_delta.
+    """
+
+    def __init__(self, tokenizer, on_delta: Callable[[str], None]):
+        self.tokenizer = tokenizer
+        self.on_delta = on_delta
+        self.token_ids: List[int] = []
+        self.text = ""
+
+    def put(self, value):
+        if value.dim() > 1:
+            value = value[0]
+        self.token_ids.extend(value.tolist())
+        text = self.tokenizer.decode(self.token_ids, skip_special_tokens=True)
+        # SentencePiece can re-segment the tail; wait until the text extends what was sent
+        if len(text) > len(self.text) and text.startswith(self.text):
+            delta = text[len(self.text):]
+            self.text = text
+            self.on_delta(delta)
+
+    def end(self):
+        pass
 
 class TranslationService:
-    def __init__(self):
+    def __init__(self, backend: Optional[str] = None):
         self.model_name = "facebook/nllb-200-distilled-600M"
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"Loading model {self.model_name} on {self.device}...")
+        # How the model is executed (INFERENCE_BACKEND unless overridden, e.g. by benchmarks)
+        self.backend = get_backend(backend or config.inference_backend)
+        configure_torch_threads(config.torch_intra_op_threads, config.torch_inter_op_threads)
+        logger.info("Loading model %s on %s (%s backend)...", self.model_name, self.device, self.backend.name)
         
         # Load model and tokenizer
         self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-        self.model = AutoModelForSeq2SeqLM.from_pretrained(self.model_name).to(self.device)
-        print("Model loaded successfully.")
+        self.model = self.backend.prepare(AutoModelForSeq2SeqLM.from_pretrained(self.model_name), self.device)
+        self.model.eval()
+        logger.info("Model loaded successfully.")
+        # NLLB tokenizers carry the source language as mutable state, so tokenization
+        # must be serialized when several inference workers share this instance
+        self._tokenizer_lock = threading.Lock()
+
+        # Generation setup is built once and reused by every translate() call
+        self.max_length = 512
+        self.lang_code_to_bos_id = self._build_lang_code_table()
+        self._generation_configs: Dict[str, GenerationConfig] = {}
         
         # Common greeting mappings to ensure proper literal translations
         self.greeting_mappings = {
@@ -33,43 +81,128 @@ class TranslationService:
             return text not in common_words
         return False
 
+    def _shortcut_translation(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        """Return a translation without running the model (proper names, common greetings), or None"""
+        # Handle proper names - don't translate them
+        if self.is_proper_name(text):
+            debug_sampled(logger, "Translation (proper name): %s (unchanged)", redact(text))
+            return text
+
+        # Check for common greeting mappings first
+        text_lower = text.lower().strip()
+        if (source_lang in self.greeting_mappings and
+            text_lower in self.greeting_mappings[source_lang] and
+            target_lang in self.greeting_mappings[source_lang][text_lower]):
+
+            translated_text = self.greeting_mappings[source_lang][text_lower][target_lang]
+            debug_sampled(logger, "Translation (mapped): %s (%s) -> %s (%s)", redact(text), source_lang, redact(translated_text), target_lang)
+            return translated_text
+
+        return None
+
+    def _fallback_translation(self, text: str) -> str:
+        # For proper names or single words, return original text
+        if self.is_proper_name(text) or len(text.split()) == 1:
+            return text
+        return f"[Translation Error] {text}"
+
+    def _build_lang_code_table(self) -> Dict[str, int]:
+        """Map every NLLB language code (e.g. spa_Latn) to its forced BOS token id"""
+        table = getattr(self.tokenizer, "lang_code_to_id", None)
+        if table:
+            return dict(table)
+        codes = self.tokenizer.additional_special_tokens
+        return dict(zip(codes, self.tokenizer.convert_tokens_to_ids(codes)))
+
+    def get_generation_config(self, target_lang: str) -> GenerationConfig:
+        """Return the cached GenerationConfig forcing target_lang as the first generated token"""
+        generation_config = self._generation_configs.get(target_lang)
+        if generation_config is None:
+            if target_lang not in self.lang_code_to_bos_id:
+                raise ValueError(f"Unsupported target language: {target_lang}")
+            generation_config = copy.deepcopy(self.model.generation_config)
+            generation_config.forced_bos_token_id = self.lang_code_to_bos_id[target_lang]
+            generation_config.max_length = self.max_length
+            self._generation_configs[target_lang] = generation_config
+        return generation_config
+
+    def _encode(self, texts: List[str], source_lang: str):
+        with self._tokenizer_lock:
+            self.tokenizer.src_lang = source_lang
+            inputs = self.tokenizer(
+                texts,
+                return_tensors="pt",
+                padding=True,
+                truncation=True,
+                max_length=self.max_length
+            )
+        return inputs.to(self.device)
+
+    def _generate(self, inputs, target_lang: str, streamer: Optional[BaseStreamer] = None):
+        with torch.inference_mode():
+            return self.model.generate(
+                **inputs,
+                generation_config=self.get_generation_config(target_lang),
+                streamer=streamer
+            )
+
+    def _decode(self, tokens) -> List[str]:
+        return self.tokenizer.batch_decode(tokens, skip_special_tokens=True)
+
     def translate(self, text: str, source_lang: str, target_lang: str) -> str:
+        translated_text = self.translate_batch([text], source_lang, target_lang)[0]
+        debug_sampled(logger, "Translation: %s (%s) -> %s (%s)", redact(text), source_lang, redact(translated_text), target_lang)
+        return translated_text
+
+    def translate_stream(self, text: str, source_lang: str, target_lang: str, on_delta: Callable[[str], None]) -> str:
+        """
+        Translate text, calling on_delta with each newly decoded piece while generation runs.
+        Returns the complete translation. on_delta is called from the inference thread.
+        """
+        shortcut = self._shortcut_translation(text, source_lang, target_lang)
+        if shortcut is not None:
+            on_delta(shortcut)
+            return shortcut
+
         try:
-            # Handle proper names - don't translate them
-            if self.is_proper_name(text):
-                print(f"Translation (proper name): '{text}' -> '{text}' (unchanged)")
-                return text
-            
-            # Check for common greeting mappings first
-            text_lower = text.lower().strip()
-            if (source_lang in self.greeting_mappings and 
-                text_lower in self.greeting_mappings[source_lang] and 
-                target_lang in self.greeting_mappings[source_lang][text_lower]):
-                
-                translated_text = self.greeting_mappings[source_lang][text_lower][target_lang]
-                print(f"Translation (mapped): {ascii(text)} ({source_lang}) -> {ascii(translated_text)} ({target_lang})")
-                return translated_text
-            
-            # Use model for other translations
-            translator = pipeline(
-                "translation",
-                model=self.model,
-                tokenizer=self.tokenizer,
-                src_lang=source_lang,
-                tgt_lang=target_lang,
-                device=0 if self.device == "cuda" else -1,
-                max_length=512
-            )
-            
-            result = translator(text)
-            translated_text = result[0]['translation_text'] if result else text
-            
-            print(f"Translation (model): {ascii(text)} ({source_lang}) -> {ascii(translated_text)} ({target_lang})")
-            return translated_text
-            
+            with stage_metrics.span("tokenize", source_lang, target_lang):
+                inputs = self._encode([text], source_lang)
+            # Incremental decoding happens inside generate when streaming
+            with stage_metrics.span("generate", source_lang, target_lang):
+                translated_tokens = self._generate(inputs, target_lang, streamer=DeltaStreamer(self.tokenizer, on_delta))
+            with stage_metrics.span("decode", source_lang, target_lang):
+                return self._decode(translated_tokens)[0]
         except Exception as e:
-            print(f"Translation error for {ascii(text)}: {e}")
-            # For proper names or single words, return original text
-            if self.is_proper_name(text) or len(text.split()) == 1:
-                return text
-            return f"[Translation Error] {text}"
\ No newline at end of file
+            logger.error("Streaming translation error (%s -> %s): %s", source_lang, target_lang, e)
+            return self._fallback_translation(text)
+
+    def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        """
+        Translate several texts sharing one language pair with a single padded generate call.
+        Results are returned in input order.
+        """
+        results: List[Optional[str]] = [
+            self._shortcut_translation(text, source_lang, target_lang) for text in texts
+        ]
+        model_indices = [i for i, result in enumerate(results) if result is None]
+        if not model_indices:
+            return results
+
+        model_texts = [texts[i] for i in model_indices]
+        try:
+            with stage_metrics.span("tokenize", source_lang, target_lang):
+                inputs = self._encode(model_texts, source_lang)
+            with stage_metrics.span("generate", source_lang, target_lang):
+                translated_tokens = self._generate(inputs, target_lang)
+            with stage_metrics.span("decode", source_lang, target_lang):
+                decoded = self._decode(translated_tokens)
+
+            for i, translated_text in zip(model_indices, decoded):
+                results[i] = translated_text
+            debug_sampled(logger, "Translation (batch of %d): %s -> %s", len(model_texts), source_lang, target_lang)
+        except Exception as e:
+            logger.error("Batch translation error (%s -> %s): %s", source_lang, target_lang, e)
+            for i in model_indices:
+                results[i] = self._fallback_translation(texts[i])
+
+        return results
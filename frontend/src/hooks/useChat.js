@@ -8,7 +8,9 @@ export const useChat = (userId, selectedLang = "eng_Latn") => {
 
     useEffect(() => {
         // Use 127.0.0.1 to avoid IPv6 resolution issues with localhost
-        const wsUrl = `ws://127.0.0.1:8000/ws/${userId}?lang=${selectedLang}`;
+        // stream=true asks the server for translation_delta frames while longer messages are translated
+        // (short ones still go through server-side batching and arrive as a single frame)
+        const wsUrl = `ws://127.0.0.1:8000/ws/${userId}?lang=${selectedLang}&stream=true`;
 
         // const wsUrl = `wss://${window.location.host}/ws/${userId}?lang=${selectedLang}`;
 
@@ -26,6 +28,25 @@ export const useChat = (userId, selectedLang = "eng_Latn") => {
         const interval = setInterval(checkConnection, 1000);
         checkConnection();
 
+        // Catch up on recent messages in the room, already translated into our language
+        fetch(`http://127.0.0.1:8000/rooms/lobby/history?lang=${selectedLang}&limit=50`)
+            .then(res => res.json())
+            .then(history => {
+                setMessages(prev => {
+                    const known = new Set(prev.map(m => m.id));
+                    const backlog = history.messages
+                        .filter(m => !known.has(m.id))
+                        .map(m => ({
+                            sender: m.sender,
+                            content: m.translated,
+                            original: m.original,
+                            id: m.id
+                        }));
+                    return [...backlog, ...prev];
+                });
+            })
+            .catch(e => console.error("Error loading history", e));
+
         // Listen for messages
         const messageHandler = (data) => {
             console.log('Received WebSocket message:', data);
@@ -35,14 +56,33 @@ export const useChat = (userId, selectedLang = "eng_Latn") => {
 
                 if (parsed.type === 'status') {
                     setStatus(parsed.content);
+                } else if (parsed.type === 'translation_delta') {
+                    setStatus(null);
+                    // Grow the partial translation in place until the final frame arrives
+                    setMessages(prev => {
+                        const existing = prev.find(m => m.id === parsed.id);
+                        if (existing) {
+                            return prev.map(m => m.id === parsed.id ? { ...m, content: m.content + parsed.delta } : m);
+                        }
+                        return [...prev, {
+                            sender: parsed.sender,
+                            content: parsed.delta,
+                            id: parsed.id,
+                            streaming: true
+                        }];
+                    });
                 } else {
                     setStatus(null); // Clear status when a real message arrives
-                    setMessages(prev => [...prev, {
+                    const message = {
                         sender: parsed.sender,
                         content: parsed.translated || parsed.content,
                         original: parsed.original,
                         id: parsed.id || (Date.now() + Math.random())
-                    }]);
+                    };
+                    // The final frame of a streamed translation replaces its partial message
+                    setMessages(prev => prev.some(m => m.id === message.id)
+                        ? prev.map(m => m.id === message.id ? message : m)
+                        : [...prev, message]);
                 }
             } catch (e) {
                 console.error("Error parsing message", e);